@@ -4,22 +4,27 @@ from getEmotionFeatures import getEmotionFeatures
 from getLanguageAnalysis import getLangAnalysis
 from backend.getLangAnalTrain import getLangTrain
 import os
-from flask import Flask,request,jsonify,send_file,Response
+from flask import Flask,request,jsonify,send_file,Response,stream_with_context
 from flask_restful import Api,Resource
 from flask_cors import CORS
+from flask_sock import Sock, ConnectionClosed
 from werkzeug.utils import secure_filename
 import torch
 import subprocess
-from langflow_report import run_flow
-from langflow_qa import run_flow_qa
+from langflow_report import run_flow_cached, stream_flow_cached, parse_report
+from langflow_qa import evaluate_answer, QA_DETAILED_DEFAULT
+from feature_summary import summarize_features
 import json
 import cv2
 import mediapipe as mp
 import numpy as np
-import time
 import threading
 import logging
-from getLivePosture import getAngle, getPosture, getSpineAngle, draw_landmarks_with_thresholds, process_video
+from getLivePosture import getAngle, getPosture, getSpineAngle, draw_landmarks_with_thresholds, process_video, LiveSessionRecorder
+from frame_hub import FrameHub
+from live_sessions import PosePool, LivePostureSession, PoolExhausted
+from live_transcription import LiveTranscriptionSession
+from posture_overlay import buildOverlay, encodeOverlayFormats
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -34,58 +39,37 @@ else:
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})  # Allow any origin for testing
 api = Api(app)
+sock = Sock(app)
 
-# Global variable to store the latest frame for live posture
-global_frame = [None]  # Using a list to make it mutable
-last_frame_time = time.time()
+# Latest processed live posture frame, shared by every streaming client
+frame_hub = FrameHub()
+# Latest landmarks and posture metrics for clients that draw the overlay themselves, encoded once per frame
+overlay_hub = FrameHub(encoder=lambda data: encodeOverlayFormats(buildOverlay(*data)))
+# Set LIVE_POSTURE_ANNOTATE=0 to stop drawing on frames when clients only use the overlay stream
+ANNOTATE_LIVE_FRAMES = os.getenv('LIVE_POSTURE_ANNOTATE', '1') != '0'
+# Posture metrics of the server camera session, summarized by /live_posture/summary
+live_recorder = LiveSessionRecorder()
 
 def generate_frames():
     logger.info("Starting frame generation")
-    last_frame = None
+    seq = 0
     frame_count = 0
     
     while True:
-        try:
-            current_time = time.time()
-            
-            if global_frame[0] is not None:
-                # Use the latest frame
-                frame = global_frame[0]
-                last_frame = frame
-                frame_count += 1
-                
-                # Log occasional status updates
-                if frame_count % 100 == 0:
-                    logger.info(f"Streamed {frame_count} frames")
-                
-                # Encode and yield the frame
-                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                if not ret:
-                    logger.error("Failed to encode frame")
-                    if last_frame is not None:
-                        # Try with the last successful frame as fallback
-                        ret, buffer = cv2.imencode('.jpg', last_frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                        if not ret:
-                            continue
-                    else:
-                        continue
-                
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                      b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                
-                # Adaptive rate control - adjust delay based on processing time
-                process_time = time.time() - current_time
-                if process_time < 0.03:  # Target ~30 fps
-                    time.sleep(max(0, 0.03 - process_time))
-            else:
-                if time.time() - last_frame_time > 5:
-                    logger.warning("No frames received for 5 seconds")
-                    last_frame_time = time.time()
-                time.sleep(0.1)
-        except Exception as e:
-            logger.error(f"Error in generate_frames: {e}")
-            time.sleep(0.1)
+        # Blocks until the processing thread publishes a newer frame
+        seq, frame_bytes = frame_hub.wait_for_frame(seq, timeout=5)
+        if frame_bytes is None:
+            logger.warning("No frames received for 5 seconds")
+            continue
+        
+        frame_count += 1
+        
+        # Log occasional status updates
+        if frame_count % 100 == 0:
+            logger.info(f"Streamed {frame_count} frames")
+        
+        yield (b'--frame\r\n'
+              b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
 
 # Direct route for video feed
 @app.route('/video_feed')
@@ -94,6 +78,71 @@ def video_feed():
     return Response(generate_frames(),
                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
+# Pose instances shared by browser-sourced live posture sessions
+pose_pool = PosePool()
+
+# Browser-sourced live posture: clients push frames or landmarks over a WebSocket
+@sock.route('/ws/live_posture')
+def live_posture_ws(ws):
+    session = LivePostureSession(pose_pool)
+    logger.info(f"Live posture session {session.session_id} opened")
+    try:
+        ws.send(json.dumps(session.describe()))
+        while True:
+            message = ws.receive()
+            try:
+                reply = session.handle_message(message)
+            except PoolExhausted as e:
+                ws.send(json.dumps({"type": "error", "error": str(e)}))
+                break
+            ws.send(session.encode(reply))
+    except ConnectionClosed:
+        pass
+    finally:
+        session.close()
+        logger.info(f"Live posture session {session.session_id} closed after {session.frame_count} frames")
+
+@sock.route('/ws/live_transcription')
+def live_transcription_ws(ws):
+    session = LiveTranscriptionSession()
+    logger.info(f"Live transcription session {session.session_id} opened")
+    try:
+        ws.send(json.dumps(session.describe()))
+        while not session.done:
+            message = ws.receive(timeout=0.1)
+            if message is not None:
+                for reply in session.handle_message(message):
+                    ws.send(json.dumps(reply))
+            for result in session.poll():
+                ws.send(json.dumps(result))
+    except ConnectionClosed:
+        pass
+    finally:
+        session.close()
+        logger.info(f"Live transcription session {session.session_id} closed after {len(session.segments)} segments")
+
+# Landmark-only overlay stream for the server camera, ?format=binary|json
+@sock.route('/ws/live_posture_overlay')
+def live_posture_overlay_ws(ws):
+    fmt = 'binary' if request.args.get('format', 'binary') == 'binary' else 'json'
+    seq = 0
+    try:
+        while True:
+            seq, encoded = overlay_hub.wait_for_frame(seq, timeout=5)
+            if encoded is None:
+                continue
+            ws.send(encoded[fmt])
+    except ConnectionClosed:
+        pass
+
+# Summary of the server camera session so far, ?reset=1 starts a new session
+@app.route('/live_posture/summary')
+def live_posture_summary():
+    summary = live_recorder.summary()
+    if request.args.get('reset') == '1':
+        live_recorder.reset()
+    return jsonify(summary)
+
 # Route to serve the test HTML page
 @app.route('/test_camera')
 def test_camera():
@@ -115,7 +164,8 @@ def initialize_camera():
         from getLivePosture import process_video
         
         # Start video processing in a separate thread
-        video_thread = threading.Thread(target=process_video, args=(global_frame,))
+        video_thread = threading.Thread(target=process_video, args=(frame_hub, overlay_hub, ANNOTATE_LIVE_FRAMES),
+                                        kwargs={"recorder": live_recorder})
         video_thread.daemon = True
         video_thread.start()
         logger.info("Video processing thread started successfully")
@@ -147,20 +197,50 @@ class Video(Resource):
             print('Emotion Features Extracted: ',emotion_features)
             language_features = getLangAnalysis(input_video_path)
             print('Language Features Extracted',language_features)
-            features_output = {
-                "Audio Features": audio_features,
-                "Posture Features": posture_features,
-                "Emotion Features": emotion_features,
-                "Language Features": language_features
-            }
-            features_output = json.dumps(features_output)
+            features_output = summarize_features(audio_features, posture_features, emotion_features, language_features)
             env = "An online interview with a company CEO"
-            report = run_flow(message='Use the features provided in the input to make your analysis',features=features_output,environment=env)
+            report = run_flow_cached(message='Use the features provided in the input to make your analysis',features=features_output,environment=env)
             return jsonify(report)
         except Exception as e:
             print(f"Error processing request: {str(e)}")
             return jsonify({'Error': str(e)})
 
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class VideoStream(Resource):
+    def post(self):
+        # Relays progress and the report as server-sent events while it is generated
+        subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
+        if 'video' not in request.files:
+            return jsonify({'Error':'Video not received'})
+        video_file = request.files['video']
+        filename = secure_filename(video_file.filename)
+        input_video_path = os.path.join(UPLOAD_FOLDER, filename)
+        video_file.save(input_video_path)
+        env = "An online interview with a company CEO"
+
+        def generate():
+            try:
+                features = []
+                for stage, extract in (("audio", getAudioFeatures), ("posture", getPostureFeatures),
+                                       ("emotion", getEmotionFeatures), ("language", getLangAnalysis)):
+                    yield sse_event('progress', {'stage': stage})
+                    features.append(extract(input_video_path))
+                features_output = summarize_features(*features)
+                yield sse_event('progress', {'stage': 'report'})
+                for kind, text in stream_flow_cached(message='Use the features provided in the input to make your analysis',features=features_output,environment=env):
+                    if kind == 'token':
+                        yield sse_event('token', {'text': text})
+                    else:
+                        yield sse_event('report', {'report': text, 'parsed': parse_report(text)})
+            except Exception as e:
+                print(f"Error processing streamed request: {str(e)}")
+                yield sse_event('error', {'Error': str(e)})
+
+        return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 class TTS(Resource):
     def post(self):
         try:
@@ -177,10 +257,13 @@ class TTS(Resource):
                 sys.path.append(current_dir)
             
             from getTTS import get_audio
+            from tts_encoding import FORMATS, negotiate_format
             
-            audio_path = get_audio(report_text)
+            fmt = negotiate_format(request.values.get('format'), request.accept_mimetypes)
+            audio_format = FORMATS[fmt]
+            audio = get_audio(report_text, fmt)
             
-            return send_file(audio_path, as_attachment=True,download_name="speech.wav", mimetype="audio/wav")
+            return send_file(audio, as_attachment=True,download_name=f"speech.{audio_format.extension}", mimetype=audio_format.mimetype)
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
@@ -188,6 +271,30 @@ class TTS(Resource):
             print(f"Detailed error: {error_details}")
             return jsonify({'Error': str(e), 'Details': error_details})
         
+class TTSStream(Resource):
+    def post(self):
+        # Starts sending audio as soon as the first chunk is synthesized
+        if 'report' not in request.form:
+            return jsonify({'Error':'Report not received'})
+        from getTTS import stream_speech
+        from tts_encoding import FORMATS, negotiate_format
+        try:
+            fmt = negotiate_format(request.values.get('format'), request.accept_mimetypes)
+        except ValueError as e:
+            return jsonify({'Error': str(e)})
+        return Response(stream_with_context(stream_speech(request.form['report'], fmt)), mimetype=FORMATS[fmt].mimetype)
+        
+class TTSMetrics(Resource):
+    def get(self):
+        from tts_cache import get_tts_cache
+        cache = get_tts_cache()
+        return jsonify({'cache': cache.stats() if cache is not None else None})
+        
+class LangflowMetrics(Resource):
+    def get(self):
+        from langflow_client import get_langflow_client
+        return jsonify(get_langflow_client().metrics())
+        
 class QA(Resource):
     def post(self):
         try:
@@ -195,12 +302,31 @@ class QA(Resource):
                 return jsonify({'Error':'Question not received'})
             question = request.form['question']
             user_answer = request.form['user_answer']
-            response = run_flow_qa(message='Execute',question=question,user_answer=user_answer)
+            detailed = request.form.get('detailed', '1' if QA_DETAILED_DEFAULT else '0').lower() in ('1', 'true', 'yes')
+            response = evaluate_answer(question, user_answer, detailed)
             return jsonify(response)
         except Exception as e:
             print(f"Error processing qa response")
             return jsonify({'Error':str(e)})
 
+class QABatch(Resource):
+    def post(self):
+        try:
+            from langflow_qa import evaluate_answers
+            data = request.get_json(silent=True) or {}
+            pairs = data.get('pairs')
+            if pairs is None and 'pairs' in request.form:
+                pairs = json.loads(request.form['pairs'])
+            if not pairs:
+                return jsonify({'Error':'Question and answer pairs not received'})
+            detailed = data.get('detailed', request.form.get('detailed', '1' if QA_DETAILED_DEFAULT else '0'))
+            detailed = str(detailed).lower() in ('1', 'true', 'yes')
+            results = evaluate_answers([(pair['question'], pair['user_answer']) for pair in pairs], detailed=detailed)
+            return jsonify([{'Error': str(result)} if isinstance(result, Exception) else result for result in results])
+        except Exception as e:
+            print(f"Error processing qa batch: {str(e)}")
+            return jsonify({'Error':str(e)})
+
 class GetLang(Resource):
     def post(self):
         try:
@@ -237,8 +363,13 @@ class GetLangTrain(Resource):
 
 
 api.add_resource(Video,'/upload')
+api.add_resource(VideoStream,'/upload/stream')
 api.add_resource(TTS, '/tts') 
+api.add_resource(TTSStream, '/tts/stream')
+api.add_resource(TTSMetrics, '/tts/metrics')
+api.add_resource(LangflowMetrics, '/langflow/metrics')
 api.add_resource(QA,'/qa')
+api.add_resource(QABatch,'/qa/batch')
 api.add_resource(GetLang,'/getlang')
 api.add_resource(LivePosture, '/live_posture')
 api.add_resource(GetLangTrain,'/getlangtrain')
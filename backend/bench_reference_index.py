@@ -0,0 +1,108 @@
+"""
+Benchmark reference index build time and query latency.
+
+Usage:
+    python bench_reference_index.py --chunks 10000 100000
+    python bench_reference_index.py --chunks 10000 --model
+
+Synthetic documents are indexed into a temporary directory. By default a
+hashing embedder stands in for the transformer so the numbers measure the
+index itself; --model uses the real embedder, whose inference then dominates.
+"""
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+import numpy as np
+from qa_index import get_embedder
+from qa_scoring import tokenize
+from reference_index import ReferenceIndex
+
+VOCABULARY_SIZE = 20000
+SENTENCES_PER_CHUNK = 6
+
+class HashingEmbedder:
+    """Bag-of-words hashing into a fixed number of dimensions, normalized like the real embeddings"""
+    model_name = 'hashing'
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self._buckets = {}
+
+    def _bucket(self, token):
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            bucket = self._buckets[token] = int(hashlib.blake2b(token.encode(), digest_size=4).hexdigest(), 16) % self.dim
+        return bucket
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            np.add.at(vectors[i], [self._bucket(token) for token in tokenize(text)], 1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+def make_documents(chunks, rng, prefix='doc'):
+    """Documents of ten chunks each, words drawn from a Zipf-like distribution"""
+    words = [f"term{i}" for i in range(VOCABULARY_SIZE)]
+    cum_weights = np.cumsum([1 / (rank + 1) for rank in range(VOCABULARY_SIZE)]).tolist()
+    documents = []
+    for doc in range(max(1, chunks // 10)):
+        sentences = [' '.join(rng.choices(words, cum_weights=cum_weights, k=20)) + '.' for _ in range(10 * SENTENCES_PER_CHUNK)]
+        documents.append((f"{prefix}{doc}", ' '.join(sentences)))
+    return documents
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+def bench(chunks, embedder, queries, seed=0):
+    rng = random.Random(seed)
+    directory = tempfile.mkdtemp(prefix='reference_index_bench_')
+    try:
+        index = ReferenceIndex(directory, embedder)
+        documents = make_documents(chunks, rng)
+        start = time.perf_counter()
+        index.add_documents(documents, batch_size=2048)
+        build = time.perf_counter() - start
+        indexed = index._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+        query_texts = [' '.join(rng.choice(documents)[1].split()[:8]) for _ in range(queries)]
+        index.search(query_texts[0])
+        keyword, hybrid = [], []
+        for query in query_texts:
+            start = time.perf_counter()
+            index.keyword_search(query, 50)
+            keyword.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            index.search(query)
+            hybrid.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        index.remove_documents([doc_id for doc_id, _ in documents[:10]])
+        remove = time.perf_counter() - start
+        start = time.perf_counter()
+        index.add_documents(make_documents(100, rng, prefix='new'))
+        add = time.perf_counter() - start
+        index.close()
+
+        print(f"{indexed:>8} chunks  build {build:7.1f}s ({indexed / build:6.0f} chunks/s)  "
+              f"bm25 p50 {percentile(keyword, 50):6.1f}ms p95 {percentile(keyword, 95):6.1f}ms  "
+              f"hybrid p50 {percentile(hybrid, 50):6.1f}ms p95 {percentile(hybrid, 95):6.1f}ms  "
+              f"remove 10 docs {remove * 1000:6.1f}ms  add 10 docs {add * 1000:6.1f}ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the reference index")
+    parser.add_argument('--chunks', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--model', action='store_true', help="Use the transformer embedder")
+    args = parser.parse_args()
+    embedder = get_embedder() if args.model else HashingEmbedder()
+    for chunks in args.chunks:
+        bench(chunks, embedder, args.queries)
+
+if __name__ == '__main__':
+    main()
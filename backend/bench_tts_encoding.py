@@ -0,0 +1,71 @@
+"""
+Benchmark encode cost against payload size for the TTS output formats.
+
+Usage:
+    python bench_tts_encoding.py --input speech.wav
+    python bench_tts_encoding.py --text "Some coaching feedback to synthesize."
+
+Without --input the text is synthesized with Kokoro first, synthesis time is
+not included in the numbers.
+"""
+import argparse
+import time
+import soundfile as sf
+from tts_encoding import FORMATS, iter_encoded
+
+SAMPLE_TEXT = (
+    "Your posture was steady for most of the session, but your shoulders drifted forward in the second half. "
+    "Try to keep your chin level and pause briefly instead of using filler words. "
+    "Your answers were well structured, although the example about teamwork could be more specific."
+)
+
+def load_audio(args):
+    if args.input:
+        audio, sample_rate = sf.read(args.input, dtype='float32')
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+        return audio, sample_rate
+    from getTTS import SAMPLE_RATE, concatenate_audio, split_text_for_tts, synthesize_chunks
+    return concatenate_audio(synthesize_chunks(split_text_for_tts(args.text))), SAMPLE_RATE
+
+def bench_format(audio, sample_rate, fmt, chunk_seconds, compression_level, repeats):
+    chunk = int(chunk_seconds * sample_rate)
+    parts = [audio[i:i + chunk] for i in range(0, len(audio), chunk)]
+    best_total = best_first = float('inf')
+    size = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        first = None
+        size = 0
+        for data in iter_encoded(parts, fmt, sample_rate, compression_level):
+            if first is None:
+                first = time.perf_counter() - start
+            size += len(data)
+        best_total = min(best_total, time.perf_counter() - start)
+        best_first = min(best_first, first)
+    return size, best_total, best_first
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TTS output encoding")
+    parser.add_argument('--input', help="WAV file to encode instead of synthesizing --text")
+    parser.add_argument('--text', default=SAMPLE_TEXT, help="Text to synthesize when no --input is given")
+    parser.add_argument('--formats', nargs='+', default=list(FORMATS), choices=list(FORMATS))
+    parser.add_argument('--chunk-seconds', type=float, default=3.0, help="Size of the arrays fed to the encoder")
+    parser.add_argument('--compression-level', type=float, default=None, help="libsndfile compression level, 0 to 1")
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    audio, sample_rate = load_audio(args)
+    duration = len(audio) / sample_rate
+    print(f"Audio: {duration:.1f}s at {sample_rate} Hz")
+    print(f"{'format':<8}{'bytes':>10}{'ratio':>8}{'kbps':>8}{'encode ms':>11}{'first ms':>10}{'x realtime':>12}")
+
+    baseline = None
+    for fmt in args.formats:
+        size, total, first = bench_format(audio, sample_rate, fmt, args.chunk_seconds, args.compression_level, args.repeats)
+        baseline = baseline or (size if fmt == 'wav' else len(audio) * 2 + 44)
+        print(f"{fmt:<8}{size:>10}{baseline / size:>8.1f}{size * 8 / duration / 1000:>8.1f}"
+              f"{total * 1000:>11.1f}{first * 1000:>10.1f}{duration / total:>12.0f}")
+
+if __name__ == '__main__':
+    main()
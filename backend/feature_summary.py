@@ -0,0 +1,151 @@
+import os
+import re
+import json
+
+# Rough budget for the feature payload sent to the report flow, in LLM tokens
+FEATURE_TOKEN_BUDGET = int(os.getenv('FEATURE_TOKEN_BUDGET', '1500'))
+# Average characters per token for English text and compact JSON
+CHARS_PER_TOKEN = 4
+
+# Detail levels tried in order until the payload fits the budget
+DETAIL_LEVELS = (
+    {"max_ranges": 8, "max_fillers": 20, "max_corrections": 12, "max_pauses": 5, "max_text_chars": None},
+    {"max_ranges": 4, "max_fillers": 10, "max_corrections": 8, "max_pauses": 3, "max_text_chars": 1500},
+    {"max_ranges": 2, "max_fillers": 5, "max_corrections": 4, "max_pauses": 1, "max_text_chars": 600},
+)
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _load(features):
+    """Feature extractors return JSON strings, accept those as well as dicts"""
+    if isinstance(features, str):
+        return json.loads(features)
+    return features or {}
+
+def _round(value, digits=1):
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {key: _round(item, digits) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_round(item, digits) for item in value]
+    return value
+
+def _parse_range(text):
+    start, _, end = str(text).partition('-')
+    return int(start), int(end or start)
+
+def merge_ranges(ranges, max_gap=1):
+    """Merge "start-end" second ranges separated by at most max_gap seconds"""
+    merged = []
+    for start, end in sorted(_parse_range(item) for item in ranges):
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def summarize_intervals(ranges, max_ranges, max_gap=1):
+    """
+    Aggregate second ranges into a total duration and the longest few ranges
+
+    Returns:
+        Dict with total_seconds, count and up to max_ranges ranges in time order
+    """
+    merged = merge_ranges(ranges, max_gap)
+    longest = sorted(sorted(merged, key=lambda item: item[0] - item[1])[:max_ranges])
+    return {
+        "total_seconds": sum(end - start + 1 for start, end in merged),
+        "count": len(merged),
+        "ranges": [f"{start}" if start == end else f"{start}-{end}" for start, end in longest]
+    }
+
+def summarize_audio(audio, level):
+    audio = _round(dict(audio), 2)
+    pauses = sorted((float(pause) for pause in audio.pop("durations_of_pauses", []) or []), reverse=True)
+    if pauses:
+        audio["longest_pauses(seconds)"] = [round(pause, 1) for pause in pauses[:level["max_pauses"]]]
+    return audio
+
+def summarize_posture(posture):
+    posture = _round(dict(posture))
+    video_info = posture.get("video_info")
+    if video_info:
+        # The local file path is noise for the report
+        posture["video_info"] = {key: value for key, value in video_info.items() if key != "path"}
+    return posture
+
+def summarize_emotion(emotion, level):
+    summary = {
+        "percentages": {label: value for label, value in _round(emotion.get("percentages", {})).items() if value > 0}
+    }
+    timestamps = {
+        label: summarize_intervals(ranges, level["max_ranges"])
+        for label, ranges in emotion.get("timestamps", {}).items() if ranges
+    }
+    if timestamps:
+        summary["timestamps(seconds)"] = timestamps
+    return summary
+
+def summarize_language(language, level):
+    summary = {}
+    text = (language.get("original_text") or "").strip()
+    if level["max_text_chars"] and len(text) > level["max_text_chars"]:
+        text = text[:level["max_text_chars"]].rsplit(' ', 1)[0] + " ..."
+    summary["original_text"] = text
+
+    words = (language.get("filler_words") or {}).get("wordlist", [])
+    by_word = {}
+    for word in words:
+        by_word[word["text"]] = by_word.get(word["text"], 0) + 1
+    summary["filler_words"] = {
+        "count": len(words),
+        "by_word": by_word,
+        "times(seconds)": [round(word["start"], 1) for word in words[:level["max_fillers"]]]
+    }
+
+    # Unchanged and repeated sentences carry no information for the coach
+    corrections = []
+    seen = set()
+    for correction in language.get("corrections", []):
+        original = correction["original"].strip()
+        corrected = correction["corrected"].strip()
+        if re.sub(r'\s+', ' ', original) == re.sub(r'\s+', ' ', corrected) or (original, corrected) in seen:
+            continue
+        seen.add((original, corrected))
+        corrections.append({"original": original, "corrected": corrected})
+    summary["corrections"] = corrections[:level["max_corrections"]]
+    if len(corrections) > level["max_corrections"]:
+        summary["more_corrections"] = len(corrections) - level["max_corrections"]
+    return summary
+
+def summarize_features(audio_features, posture_features, emotion_features, language_features,
+                       token_budget=FEATURE_TOKEN_BUDGET):
+    """
+    Build the compact feature payload for the report flow
+
+    Args:
+        audio_features, posture_features, emotion_features, language_features:
+            Outputs of the feature extractors, as dicts or JSON strings
+        token_budget: Approximate token budget, detail is reduced until the payload fits
+
+    Returns:
+        Compact JSON string with rounded numbers, aggregated intervals,
+        deduped corrections and a capped filler word list
+    """
+    audio = _load(audio_features)
+    posture = _load(posture_features)
+    emotion = _load(emotion_features)
+    language = _load(language_features)
+    for level in DETAIL_LEVELS:
+        payload = json.dumps({
+            "Audio Features": summarize_audio(audio, level),
+            "Posture Features": summarize_posture(posture),
+            "Emotion Features": summarize_emotion(emotion, level),
+            "Language Features": summarize_language(language, level)
+        }, separators=(',', ':'), ensure_ascii=False)
+        if estimate_tokens(payload) <= token_budget:
+            break
+    print(f"Feature payload: {len(payload)} chars, ~{estimate_tokens(payload)} tokens")
+    return payload
@@ -0,0 +1,128 @@
+import re
+import threading
+
+# Filler phrases per language, multi-word phrases are matched across consecutive words.
+# "[*]" is the disfluency marker whisper_timestamped emits with detect_disfluencies=True.
+FILLER_LEXICONS = {
+    'en': ["[*]", "hmm", "uhh", "um", "uh", "like", "you know"],
+    'es': ["[*]", "eh", "em", "este", "pues", "o sea", "bueno"],
+    'fr': ["[*]", "euh", "hum", "ben", "bah", "genre", "tu sais"],
+}
+DEFAULT_LANGUAGE = 'en'
+
+_EDGE_PUNCTUATION = re.compile(r"^[^\w\[\]*']+|[^\w\[\]*']+$")
+
+def normalize_token(text):
+    """Lowercase a word and strip the punctuation Whisper attaches to it"""
+    return _EDGE_PUNCTUATION.sub('', text.strip().lower())
+
+class FillerMatcher:
+    """
+    Aho-Corasick automaton over normalized tokens.
+
+    Phrases are inserted into a token trie with failure links, so one pass over
+    the words finds every phrase occurrence in time linear in the number of
+    words plus matches, however long the transcript.
+    """
+
+    def __init__(self, phrases):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        for phrase in phrases:
+            self._add([normalize_token(token) for token in phrase.split()])
+        self._build()
+
+    def _add(self, tokens):
+        if not tokens:
+            return
+        node = 0
+        for token in tokens:
+            child = self._goto[node].get(token)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][token] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            node = child
+        self._output[node] = self._output[node] + (len(tokens),)
+
+    def _build(self):
+        # Breadth-first so every failure target is finished before its dependents
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for token, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                if node:
+                    self._fail[child] = self._goto[fail].get(token, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                queue.append(child)
+
+    def matches(self, tokens):
+        """
+        Find phrase occurrences in a token sequence
+
+        Returns:
+            Non-overlapping (start, end) token index spans, end exclusive, preferring
+            the longest phrase among those starting earliest
+        """
+        # Longest phrase ending anywhere, keyed by the index it starts at
+        longest = {}
+        node = 0
+        for index, token in enumerate(tokens):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            for length in self._output[node]:
+                start = index + 1 - length
+                if longest.get(start, 0) < length:
+                    longest[start] = length
+        spans = []
+        end = 0
+        for start in range(len(tokens)):
+            if start >= end and start in longest:
+                end = start + longest[start]
+                spans.append((start, end))
+        return spans
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+def get_matcher(language=DEFAULT_LANGUAGE):
+    """Compiled matcher for a language, falling back to English for unknown languages"""
+    language = language if language in FILLER_LEXICONS else DEFAULT_LANGUAGE
+    with _matchers_lock:
+        matcher = _matchers.get(language)
+        if matcher is None:
+            matcher = _matchers[language] = FillerMatcher(FILLER_LEXICONS[language])
+        return matcher
+
+def find_fillers(words, language=DEFAULT_LANGUAGE):
+    """
+    Detect filler words and phrases in a Whisper word stream
+
+    Args:
+        words: Word dicts with text, start, end and confidence, in order
+        language: Lexicon to use
+
+    Returns:
+        Filler spans as word dicts. Single-word fillers are the original word,
+        phrases are merged into one dict spanning their words.
+    """
+    tokens = [normalize_token(word["text"]) for word in words]
+    fillers = []
+    for start, end in get_matcher(language).matches(tokens):
+        if end - start == 1:
+            fillers.append(words[start])
+            continue
+        span = words[start:end]
+        fillers.append({
+            "text": " ".join(word["text"].strip() for word in span),
+            "start": span[0]["start"],
+            "end": span[-1]["end"],
+            "confidence": min(word.get("confidence", 1.0) for word in span)
+        })
+    return fillers
@@ -0,0 +1,80 @@
+import threading
+import logging
+import cv2
+
+logger = logging.getLogger(__name__)
+
+class FrameHub:
+    """
+    Broadcasts the latest processed frame to any number of streaming clients.
+
+    Frames are JPEG-encoded by default; pass encoder to broadcast other payloads,
+    such as posture overlay messages.
+
+    The producer publishes raw frames with a sequence number. Each frame is
+    encoded at most once, by whichever client asks for it first, and every
+    client blocks on a condition variable until a newer frame exists. Clients
+    that fall behind simply get the newest frame, older ones are dropped.
+    """
+
+    def __init__(self, jpeg_quality=85, encoder=None):
+        self.jpeg_quality = jpeg_quality
+        self.encoder = encoder
+        self._condition = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._encode_lock = threading.Lock()
+        self._encoded = None
+        self._encoded_seq = 0
+
+    @property
+    def seq(self):
+        """Sequence number of the latest published frame (0 before the first one)"""
+        return self._seq
+
+    def publish(self, frame):
+        """Make frame the latest frame and wake up all waiting clients"""
+        with self._condition:
+            self._frame = frame
+            self._seq += 1
+            self._condition.notify_all()
+
+    def wait_for_frame(self, last_seq, timeout=None):
+        """
+        Block until a frame newer than last_seq is available
+
+        Args:
+            last_seq: Sequence number of the last frame the client sent
+            timeout: Maximum number of seconds to wait
+
+        Returns:
+            Tuple of (seq, encoded bytes), or (last_seq, None) on timeout
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._seq > last_seq, timeout):
+                return last_seq, None
+            seq, frame = self._seq, self._frame
+        return self._encode(seq, frame, last_seq)
+
+    def encode(self, frame):
+        """Encode a frame for the wire"""
+        if self.encoder is not None:
+            return self.encoder(frame)
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ret:
+            return None
+        return buffer.tobytes()
+
+    def _encode(self, seq, frame, last_seq):
+        with self._encode_lock:
+            if self._encoded_seq < seq:
+                encoded = self.encode(frame)
+                if encoded is None:
+                    logger.error("Failed to encode frame")
+                else:
+                    self._encoded = encoded
+                    self._encoded_seq = seq
+            # If encoding failed, fall back to the last frame that did encode
+            if self._encoded is None or self._encoded_seq <= last_seq:
+                return seq, None
+            return self._encoded_seq, self._encoded
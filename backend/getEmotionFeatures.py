@@ -2,16 +2,125 @@ import cv2
 from deepface import DeepFace
 import json
 import sys
+import numpy as np
+from array import array
+class EmotionTimeline:
+    """
+    Compact per-frame emotion timeline.
+
+    Labels are stored once in a label table and frames are stored as run-length
+    encoded (code, length) segments, so memory and serialization scale with the
+    number of emotion changes rather than with the number of frames.
+    """
+
+    def __init__(self, fps, labels=None):
+        self.fps = float(fps) if fps else 30.0
+        self.labels = []
+        self._label_codes = {}
+        self.run_codes = array('B')
+        self.run_lengths = array('I')
+        self.frame_count = 0
+        for label in labels or []:
+            self.label_code(label)
+
+    def label_code(self, label):
+        """Returns the uint8 code of a label, adding it to the label table if needed"""
+        code = self._label_codes.get(label)
+        if code is None:
+            if len(self.labels) > 255:
+                raise ValueError("EmotionTimeline supports at most 256 distinct labels")
+            code = len(self.labels)
+            self.labels.append(label)
+            self._label_codes[label] = code
+        return code
+
+    def append(self, label):
+        """Adds the label of the next frame"""
+        code = self.label_code(label)
+        if self.run_codes and self.run_codes[-1] == code:
+            self.run_lengths[-1] += 1
+        else:
+            self.run_codes.append(code)
+            self.run_lengths.append(1)
+        self.frame_count += 1
+
+    def codes(self):
+        """Expands the timeline into a uint8 array with one label code per frame"""
+        return np.repeat(np.frombuffer(self.run_codes, dtype=np.uint8),
+                         np.frombuffer(self.run_lengths, dtype=np.uint32))
+
+    def counts(self):
+        """Returns the number of frames per label"""
+        totals = np.bincount(np.frombuffer(self.run_codes, dtype=np.uint8),
+                             weights=np.frombuffer(self.run_lengths, dtype=np.uint32),
+                             minlength=len(self.labels))
+        return {label: int(totals[code]) for code, label in enumerate(self.labels) if totals[code]}
+
+    def percentages(self):
+        """Returns the percentage of frames per label"""
+        if not self.frame_count:
+            return {}
+        return {label: (count / self.frame_count) * 100 for label, count in self.counts().items()}
+
+    def timestamp_ranges(self, emotions=None):
+        """
+        Returns consolidated integer-second ranges per emotion, in the same format
+        as consolidate_timestamps, computed directly from the run-length segments.
+
+        Args:
+            emotions (iterable): Emotions to report; defaults to every label in the timeline
+
+        Returns:
+            dict: Dictionary with emotions as keys and lists of timestamp ranges as values
+        """
+        emotions = self.labels if emotions is None else emotions
+        ranges = {emotion: [] for emotion in emotions}
+        start_frame = 0
+        for code, length in zip(self.run_codes, self.run_lengths):
+            emotion_ranges = ranges.get(self.labels[code])
+            if emotion_ranges is not None:
+                first = int(start_frame / self.fps)
+                last = int((start_frame + length - 1) / self.fps)
+                if emotion_ranges and first <= emotion_ranges[-1][1] + 1:
+                    emotion_ranges[-1][1] = max(emotion_ranges[-1][1], last)
+                else:
+                    emotion_ranges.append([first, last])
+            start_frame += length
+        return {emotion: format_ranges(emotion_ranges) for emotion, emotion_ranges in ranges.items()}
+
+    def to_dict(self):
+        """Serializable form of the timeline"""
+        return {
+            "fps": self.fps,
+            "labels": list(self.labels),
+            "runs": [[code, length] for code, length in zip(self.run_codes, self.run_lengths)]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        timeline = cls(data["fps"], data["labels"])
+        for code, length in data["runs"]:
+            timeline.run_codes.append(code)
+            timeline.run_lengths.append(length)
+            timeline.frame_count += length
+        return timeline
+
 def emotion_func(video_path):
+    """
+    Runs emotion detection over the video in a single pass.
+
+    Args:
+        video_path (str): Path to the input video
+
+    Returns:
+        EmotionTimeline: Run-length encoded dominant emotion of every frame
+    """
     cap = cv2.VideoCapture(video_path)
 
     if not cap.isOpened():
         raise IOError("Cannot open video file")
 
-    faceCascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-
-    emotions_data = {}
-    frame_count = 0
+    timeline = EmotionTimeline(cap.get(cv2.CAP_PROP_FPS))
 
     while True:
         ret, frame = cap.read()
@@ -24,14 +133,14 @@ def emotion_func(video_path):
         except:
             dominant_emotion = "No Face Detected"
 
-        emotions_data[f"frame_{frame_count}"] = dominant_emotion
-        frame_count += 1
-
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = faceCascade.detectMultiScale(gray, 1.1, 4)
+        timeline.append(dominant_emotion)
 
     cap.release()
-    return emotions_data
+    return timeline
+
+def format_ranges(ranges):
+    """Formats [start, end] second pairs the same way consolidate_timestamps does"""
+    return [f"{start}" if start == end else f"{start}-{end}" for start, end in ranges]
 
 def consolidate_timestamps(emotion_timestamps):
     """
@@ -89,18 +198,11 @@ def consolidate_timestamps(emotion_timestamps):
 
 def getEmotionFeatures(videoPath):
     #edit this array acc. to what emotions u need
-    target_emotions = ["fearful","neutral","No Face Detected"]
-    data,emotion_timestamps = emotion_func(videoPath, target_emotions)
-    total_frames = len(data)
-    emotion_counts = {}
-
-    for emotion in data.values():
-        if emotion not in emotion_counts:
-            emotion_counts[emotion] = 0
-        emotion_counts[emotion] += 1
-
-    emotion_percentages = {emotion: (count / total_frames) * 100 for emotion, count in emotion_counts.items()}
-    consolidated_timestamps = consolidate_timestamps(emotion_timestamps)
+    target_emotions = ["fear","neutral","No Face Detected"]
+    timeline = emotion_func(videoPath)
+
+    emotion_percentages = timeline.percentages()
+    consolidated_timestamps = timeline.timestamp_ranges(target_emotions)
 
     final_result = {
         "percentages": emotion_percentages,
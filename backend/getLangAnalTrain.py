@@ -5,6 +5,7 @@ import re
 from gramformer import Gramformer
 import os
 from getAudioFeatures import getAudio
+from filler_words import find_fillers
 
 
 def set_seed(seed):
@@ -13,11 +14,6 @@ def set_seed(seed):
     torch.cuda.manual_seed_all(seed)
 
 
-def contains_filler(word_list):
-    filler_words = {"[*]", "hmm", "uhh", "um", "uh", "like", "you know"}
-    return [word for word in word_list if word["text"].lower() in filler_words]
-
-
 def process_language_train(path):
     try:
         print("Running language processing")
@@ -44,8 +40,8 @@ def process_language_train(path):
             result = json.loads(output.decode())
             text = result['text']
             corrected_text = ''
-            filtered_words = [contains_filler(segment["words"]) for segment in result["segments"]]
-            filtered_words = [word for word_list in filtered_words for word in word_list] 
+            # One pass over the whole word stream so phrases spanning segments are found
+            filtered_words = find_fillers([word for segment in result["segments"] for word in segment["words"]], language='en')
             print("Grammar Check...")
             grammar_list = []
             highlight_list = []
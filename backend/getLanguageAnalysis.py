@@ -6,6 +6,7 @@ import re
 from gramformer import Gramformer
 from getAudioFeatures import getAudio
 import os
+from filler_words import find_fillers
 
 def set_seed(seed):
   torch.manual_seed(seed)
@@ -13,10 +14,6 @@ def set_seed(seed):
     torch.cuda.manual_seed_all(seed)
 
 
-def contains_filler(word_list):
-    filler_words = {"[*]", "hmm", "uhh", "um", "uh", "like", "you know"}
-    return [word for word in word_list if word["text"].lower() in filler_words]
-
 def getLang(videoPath):
     try:
         wav_path = os.path.join('uploads', os.path.splitext(os.path.basename(videoPath))[0] + '.wav')
@@ -44,8 +41,8 @@ def getLang(videoPath):
             result = json.loads(output.decode())
             text = result['text']
             corrected_text = ''
-            filtered_words = [contains_filler(segment["words"]) for segment in result["segments"]]
-            filtered_words = [word for word_list in filtered_words for word in word_list] 
+            # One pass over the whole word stream so phrases spanning segments are found
+            filtered_words = find_fillers([word for segment in result["segments"] for word in segment["words"]], language='en')
             print("Grammar Check...")
             grammar_list = []
             parsed_sentences = re.split(r'(?<=[.!?])\s+', text)
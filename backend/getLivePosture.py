@@ -1,9 +1,12 @@
 import cv2
 import mediapipe as mp
 import numpy as np
+import math
 import time
 import threading
 import logging
+from collections import namedtuple
+from getPostureFeatures import PostureRecorder
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -46,6 +49,92 @@ def init_camera():
     
     return cap
 
+class CameraCapture:
+    """
+    Reads the camera on a dedicated thread and keeps only the latest frame.
+
+    The camera is drained as fast as it delivers frames, so frames never queue
+    up in the driver buffer, and consumers always get the newest frame when
+    they are ready for one.
+    """
+
+    def __init__(self, open_camera=None, max_failures=5):
+        self._open_camera = open_camera or init_camera
+        self.max_failures = max_failures
+        self._cap = self._open_camera()
+        self._condition = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._seq = 0
+        self._running = False
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        failures = 0
+        try:
+            while self._running:
+                success, frame = self._cap.read()
+                if not success:
+                    failures += 1
+                    logger.warning("Failed to read from camera")
+                    # Try to reinitialize camera after consecutive failures
+                    if failures % self.max_failures == 0:
+                        logger.info("Attempting to reinitialize camera")
+                        self._cap.release()
+                        time.sleep(1)
+                        try:
+                            self._cap = self._open_camera()
+                        except Exception as e:
+                            logger.error(f"Failed to reinitialize camera: {e}")
+                            break
+                    continue
+                failures = 0
+                with self._condition:
+                    self._frame = frame
+                    self._timestamp = time.time()
+                    self._seq += 1
+                    self._condition.notify_all()
+        finally:
+            # Released here rather than in stop() so it never happens during a read
+            self._cap.release()
+            with self._condition:
+                self._running = False
+                self._condition.notify_all()
+
+    def read_latest(self, last_seq, timeout=1.0):
+        """
+        Wait for a frame newer than last_seq
+
+        Returns:
+            Tuple of (seq, frame, capture timestamp), frame is None on timeout or after stop
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > last_seq or not self._running, timeout)
+            if self._seq <= last_seq:
+                return last_seq, None, None
+            return self._seq, self._frame, self._timestamp
+
+    def stop(self):
+        """Stop capturing, the capture thread releases the camera once its current read returns"""
+        self._running = False
+        if self._thread is None:
+            self._cap.release()
+            return
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+            if self._thread.is_alive():
+                logger.warning("Camera read still in progress, the camera will be released when it returns")
+
 def getAngle(a, b, c):
     """Calculate angle between three points"""
     pA = np.array(a)
@@ -108,6 +197,49 @@ def getSpineAngle(results, img):
     spine_angle = getAngle(vertical_reference, shoulder_midpoint, hip_midpoint)
     return 180 - spine_angle
 
+def landmarksToArray(pose_landmarks):
+    """Convert MediaPipe pose landmarks to a (33, 4) array of normalized x, y, z, visibility"""
+    return np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in pose_landmarks.landmark], dtype=np.float32)
+
+def getPostureMetrics(landmarks, width, height):
+    """
+    Calculate head tilt, shoulder tilt and spine angle from an array of landmarks
+
+    Args:
+        landmarks: (33, >=2) array of normalized landmark coordinates
+        width: Frame width in pixels
+        height: Frame height in pixels
+
+    Returns:
+        Tuple of (head_tilt, shoulder_tilt, spine_angle), computed like getPosture and getSpineAngle
+    """
+    points = (np.asarray(landmarks, dtype=np.float64)[:, :2] * (width, height)).astype(int)
+    nose = tuple(points[mp_pose.PoseLandmark.NOSE.value])
+    left_shoulder = tuple(points[mp_pose.PoseLandmark.LEFT_SHOULDER.value])
+    right_shoulder = tuple(points[mp_pose.PoseLandmark.RIGHT_SHOULDER.value])
+    left_hip = tuple(points[mp_pose.PoseLandmark.LEFT_HIP.value])
+    right_hip = tuple(points[mp_pose.PoseLandmark.RIGHT_HIP.value])
+    
+    head_tilt = getAngle(left_shoulder, nose, right_shoulder)
+    shoulder_tilt = np.abs(left_shoulder[1] - right_shoulder[1])
+    
+    shoulder_midpoint = ((left_shoulder[0] + right_shoulder[0]) // 2, 
+                         (left_shoulder[1] + right_shoulder[1]) // 2)
+    hip_midpoint = ((left_hip[0] + right_hip[0]) // 2, 
+                    (left_hip[1] + right_hip[1]) // 2)
+    vertical_reference = (shoulder_midpoint[0], shoulder_midpoint[1] - 100)
+    spine_angle = 180 - getAngle(vertical_reference, shoulder_midpoint, hip_midpoint)
+    
+    return float(head_tilt), float(shoulder_tilt), float(spine_angle)
+
+def getThresholdStates(head_tilt, shoulder_tilt, spine_angle):
+    """Return whether each posture metric is within its threshold"""
+    return {
+        "head_tilt_ok": bool(MIN_HEAD_THRESHOLD <= head_tilt <= MAX_HEAD_THRESHOLD),
+        "shoulder_tilt_ok": bool(shoulder_tilt <= SHOULDER_THRESHOLD),
+        "spine_angle_ok": bool(spine_angle >= SPINE_THRESHOLD)
+    }
+
 # Custom drawing function to highlight connections that exceed thresholds
 def draw_landmarks_with_thresholds(image, landmarks, connections, 
                                   landmark_drawing_spec=None, 
@@ -178,144 +310,339 @@ def draw_landmarks_with_thresholds(image, landmarks, connections,
         # Draw the connection
         cv2.line(image, start_point, end_point, connection_color, 2)
 
-def process_video(global_frame_var):
-    """Process video and update the global frame"""
-    # Initialize webcam
+class LiveSessionRecorder(PostureRecorder):
+    """
+    Records the posture metrics of a live session so it can be summarized like an
+    uploaded video, without a second decode-and-inference pass over a recording.
+    Timestamps are seconds since the session started.
+    """
+
+    def __init__(self, capacity=1024):
+        super().__init__(capacity)
+        self.started_at = time.time()
+
+    def reset(self):
+        with self._lock:
+            self.size = 0
+            self.started_at = time.time()
+
+    def record(self, landmarks, width, height, timestamp=None, metrics=None):
+        """
+        Record the metrics of one frame, computed from landmarks unless already given
+
+        Returns:
+            Tuple of (head_tilt, shoulder_tilt, spine_angle)
+        """
+        if metrics is None:
+            metrics = getPostureMetrics(landmarks, width, height)
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            started_at = self.started_at
+        self.append(timestamp - started_at, *metrics)
+        return metrics
+
+    def summary(self):
+        """Same issue intervals and frame statistics as analyze_video, for the session so far"""
+        with self._lock:
+            started_at = self.started_at
+        duration = time.time() - started_at
+        summary = {"session_info": {"duration_seconds": float(duration)}}
+        summary.update(super().summary(
+            end_time=duration,
+            max_head_threshold=MAX_HEAD_THRESHOLD,
+            min_head_threshold=MIN_HEAD_THRESHOLD,
+            shoulder_threshold=SHOULDER_THRESHOLD,
+            spine_threshold=SPINE_THRESHOLD
+        ))
+        return summary
+
+# Stand-in for a MediaPipe landmark so array landmarks can be drawn with draw_landmarks_with_thresholds
+Landmark = namedtuple('Landmark', ['x', 'y', 'z', 'visibility'])
+
+class ArrayLandmarks:
+    """Minimal NormalizedLandmarkList backed by a (33, 4) landmark array"""
+    def __init__(self, landmarks):
+        self.landmark = [Landmark(*row) for row in landmarks.tolist()]
+
+class InferenceScheduler:
+    """
+    Picks the pose inference stride and model complexity from measured latency.
+
+    Keeps an EWMA of pose.process time. When it exceeds the latency budget the
+    model complexity is lowered first; at the lowest complexity the stride is
+    the number of captured frames one inference takes, so the cost per
+    captured frame fits the budget. When there is headroom the stride is
+    reduced first, then the complexity is raised again, unless that
+    complexity was last measured over the budget. Latency is tracked per
+    complexity so that measurement survives switching away from it.
+    """
+
+    def __init__(self, target_latency=0.04, initial_complexity=1, max_complexity=2, max_stride=4,
+                 alpha=0.2, cooldown=15):
+        self.target_latency = target_latency
+        self.complexity = initial_complexity
+        self.min_complexity = 0
+        self.max_complexity = max_complexity
+        self.max_stride = max_stride
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.stride = 1
+        self._latencies = {}
+        self._frames_since_inference = 0
+        self._inferences_since_change = 0
+
+    @property
+    def latency(self):
+        """EWMA inference latency of the current model complexity, None before it was measured"""
+        return self._latencies.get(self.complexity)
+
+    def should_infer(self):
+        """Call once per captured frame; True if this frame should go through pose inference"""
+        self._frames_since_inference += 1
+        if self._frames_since_inference >= self.stride:
+            self._frames_since_inference = 0
+            return True
+        return False
+
+    def record(self, latency):
+        """Record the duration of one pose.process call and adapt stride/complexity"""
+        previous = self._latencies.get(self.complexity)
+        self._latencies[self.complexity] = latency if previous is None else self.alpha * latency + (1 - self.alpha) * previous
+        self._inferences_since_change += 1
+        if self._inferences_since_change < self.cooldown:
+            return
+        
+        if self.latency > self.target_latency * 1.2 and self.complexity > self.min_complexity:
+            self._change(complexity=self.complexity - 1)
+            return
+        # Stride does not change the inference latency itself, only how many frames share it
+        required = min(self.max_stride, max(1, math.ceil(self.latency / self.target_latency)))
+        if required > self.stride:
+            self._change(stride=required)
+        elif required < self.stride:
+            # Step down only with some headroom at the smaller stride, so it does not flap at the boundary
+            if self.latency < (self.stride - 1) * self.target_latency * 0.8:
+                self._change(stride=required)
+        elif self.stride == 1 and self.latency < self.target_latency * 0.6 and self.complexity < self.max_complexity:
+            # Going back up to a model that did not fit the budget would only bounce straight down again
+            measured = self._latencies.get(self.complexity + 1)
+            if measured is None or measured <= self.target_latency:
+                self._change(complexity=self.complexity + 1)
+
+    def exclude_complexity(self, complexity, fallback):
+        """Stop using a model complexity that failed to load and go back to fallback"""
+        if complexity < fallback:
+            self.min_complexity = fallback
+        else:
+            self.max_complexity = fallback
+        self._change(complexity=fallback)
+
+    def _change(self, complexity=None, stride=None):
+        if complexity is not None:
+            self.complexity = complexity
+        if stride is not None:
+            self.stride = stride
+        self._inferences_since_change = 0
+        logger.info(f"Inference scheduler: model_complexity={self.complexity}, stride={self.stride}")
+
+class LandmarkExtrapolator:
+    """Linearly extrapolates landmarks from the last two inferences for frames that skip inference"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._prev = None
+        self._last = None
+
+    def update(self, timestamp, landmarks):
+        self._prev = self._last
+        self._last = (timestamp, landmarks)
+
+    def predict(self, timestamp):
+        if self._last is None:
+            return None
+        last_time, last_landmarks = self._last
+        if self._prev is None:
+            return last_landmarks
+        prev_time, prev_landmarks = self._prev
+        interval = last_time - prev_time
+        if interval <= 0:
+            return last_landmarks
+        # Never extrapolate further than one inference interval ahead
+        step = min(max((timestamp - last_time) / interval, 0.0), 1.0)
+        predicted = last_landmarks + (last_landmarks - prev_landmarks) * step
+        predicted[:, 3] = last_landmarks[:, 3]
+        return predicted
+
+def annotate_frame(image, landmarks, fps, metrics=None):
+    """Draw landmarks, posture metrics and FPS onto the frame, metrics are computed from landmarks if None"""
+    height, width, _ = image.shape
+    if landmarks is not None:
+        # Calculate posture metrics
+        head_tilt, shoulder_tilt, spine_angle = metrics or getPostureMetrics(landmarks, width, height)
+        
+        # Draw landmarks with threshold-based coloring
+        draw_landmarks_with_thresholds(
+            image,
+            ArrayLandmarks(landmarks),
+            mp_pose.POSE_CONNECTIONS,
+            head_tilt=head_tilt,
+            shoulder_tilt=shoulder_tilt,
+            spine_angle=spine_angle
+        )
+        
+        # Display metrics with color-coded text
+        head_tilt_color = (0, 255, 0) if MIN_HEAD_THRESHOLD <= head_tilt <= MAX_HEAD_THRESHOLD else (0, 0, 255)
+        shoulder_tilt_color = (0, 255, 0) if shoulder_tilt <= SHOULDER_THRESHOLD else (0, 0, 255)
+        spine_angle_color = (0, 255, 0) if spine_angle >= SPINE_THRESHOLD else (0, 0, 255)
+        
+        cv2.putText(image, f"Head Tilt: {head_tilt:.1f}", (10, 30), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, head_tilt_color, 2)
+        cv2.putText(image, f"Shoulder Tilt: {shoulder_tilt:.1f}", (10, 70), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, shoulder_tilt_color, 2)
+        cv2.putText(image, f"Spine Angle: {spine_angle:.1f}", (10, 110), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, spine_angle_color, 2)
+        
+        # Display thresholds (only when FPS is high enough to reduce processing)
+        if fps > 10:
+            cv2.putText(image, f"Head Tilt Thresholds: {MIN_HEAD_THRESHOLD}-{MAX_HEAD_THRESHOLD}", (10, 150), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1)
+            cv2.putText(image, f"Shoulder Tilt Threshold: {SHOULDER_THRESHOLD}", (10, 180), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1)
+            cv2.putText(image, f"Spine Angle Threshold: {SPINE_THRESHOLD}", (10, 210), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1)
+    else:
+        # Add text to indicate no pose detected
+        cv2.putText(image, "No pose detected", (10, 30), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+    
+    # Display FPS
+    cv2.putText(image, f"FPS: {int(fps)}", (image.shape[1] - 120, 30), 
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+def create_pose(model_complexity):
+    return mp_pose.Pose(
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+        model_complexity=model_complexity,
+        smooth_landmarks=True)
+
+def process_video(frame_hub, overlay_hub=None, annotate=True, target_latency=0.04, recorder=None):
+    """
+    Process video and publish each processed frame to the frame hub
+
+    Args:
+        frame_hub: FrameHub receiving the (annotated) video frames
+        overlay_hub: Optional FrameHub receiving (frame, landmarks, width, height, metrics) tuples
+            for clients that render the overlay themselves
+        annotate: Whether to draw landmarks and metrics onto the frames. With False the
+            frames are published as captured and only the overlay data carries the pose
+        target_latency: Pose inference latency budget in seconds used by the InferenceScheduler
+        recorder: Optional LiveSessionRecorder that receives the metrics of every inferred frame
+    """
+    # Initialize webcam, capture runs on its own thread
     logger.info("Starting video processing")
     
     try:
-        cap = init_camera()
+        capture = CameraCapture().start()
     except Exception as e:
         logger.error(f"Error initializing camera: {e}")
         return
+    # The session starts when the camera does, not when the recorder was created
+    if recorder is not None:
+        recorder.reset()
     
     prev_frame_time = 0
+    fps = 0
     frame_count = 0
-    skip_count = 0
     processed_count = 0
+    seq = 0
+    dropped_count = 0
+    scheduler = InferenceScheduler(target_latency=target_latency)
+    extrapolator = LandmarkExtrapolator()
+    # One Pose graph per model complexity, created when the scheduler first picks it
+    poses = {}
+    active_complexity = None
     
     try:
-        # Initialize pose detection with more efficient settings
-        with mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-            model_complexity=1,  # Use model complexity 1 for balance of speed and accuracy
-            smooth_landmarks=True) as pose:
+        while capture.running:
+            # Pull the newest frame; anything captured while we were busy is skipped
+            new_seq, image, capture_time = capture.read_latest(seq)
+            if image is None:
+                continue
+            dropped_count += new_seq - seq - 1
+            seq = new_seq
+            frame_count += 1
             
-            logger.info("MediaPipe Pose initialized")
+            # Calculate displayed FPS
+            current_time = time.time()
+            if prev_frame_time > 0:
+                fps = 1/(current_time-prev_frame_time)
+            prev_frame_time = current_time
             
-            while cap.isOpened():
-                success, image = cap.read()
-                if not success:
-                    logger.warning("Failed to read from camera")
-                    # Try to reinitialize camera after 5 consecutive failures
-                    if frame_count % 5 == 0:
-                        logger.info("Attempting to reinitialize camera")
-                        cap.release()
-                        time.sleep(1)
-                        try:
-                            cap = init_camera()
-                        except Exception as e:
-                            logger.error(f"Failed to reinitialize camera: {e}")
-                            return
-                    continue
-                
-                frame_count += 1
-                
-                # Calculate FPS
-                current_time = time.time()
-                fps = 1/(current_time-prev_frame_time) if prev_frame_time > 0 else 0
-                prev_frame_time = current_time
-                
-                # Skip processing every other frame if FPS is too low
-                # This ensures we maintain a smoother video stream even if processing is slow
-                if fps < 15 and skip_count % 2 != 0:
-                    skip_count += 1
-                    # Just update the frame with the raw image
-                    if global_frame_var[0] is None:  # Only on first frame
-                        # Flip image for mirror effect
-                        image = cv2.flip(image, 1)
-                        global_frame_var[0] = image
-                    continue
-                
-                skip_count += 1
-                processed_count += 1
-                
-                # Log frame info occasionally
-                if processed_count % 100 == 0:
-                    logger.info(f"Processed {processed_count} frames, current FPS: {int(fps)}")
-                
-                # Flip image for mirror effect before processing
-                image = cv2.flip(image, 1)
-                
-                # Create a copy for display while processing in the background
-                display_image = image.copy()
-                
-                # Improve performance by marking image as not writeable
-                image.flags.writeable = False
+            # Flip image for mirror effect before processing
+            image = cv2.flip(image, 1)
+            height, width, _ = image.shape
+            
+            inferred = scheduler.should_infer()
+            if inferred:
+                if scheduler.complexity != active_complexity and scheduler.complexity in poses:
+                    # A cached graph's tracking state is from before it was switched away from
+                    poses[scheduler.complexity].reset()
+                if scheduler.complexity not in poses:
+                    try:
+                        poses[scheduler.complexity] = create_pose(scheduler.complexity)
+                        logger.info(f"MediaPipe Pose initialized with model_complexity={scheduler.complexity}")
+                    except Exception as e:
+                        if active_complexity is None:
+                            raise
+                        logger.warning(f"Could not load model_complexity={scheduler.complexity}: {e}")
+                        scheduler.exclude_complexity(scheduler.complexity, active_complexity)
+                active_complexity = scheduler.complexity
+                pose = poses[active_complexity]
                 
                 # Convert to RGB for MediaPipe
                 rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                rgb_image.flags.writeable = False
                 
-                # Process with MediaPipe
+                inference_start = time.perf_counter()
                 results = pose.process(rgb_image)
-                
-                # Draw pose landmarks on image
-                image.flags.writeable = True
-                
-                # Convert back to BGR
-                image = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR)
+                scheduler.record(time.perf_counter() - inference_start)
+                processed_count += 1
                 
                 if results.pose_landmarks:
-                    # Calculate posture metrics
-                    head_tilt, shoulder_tilt = getPosture(results, image)
-                    spine_angle = getSpineAngle(results, image)
-                    
-                    # Draw landmarks with threshold-based coloring
-                    draw_landmarks_with_thresholds(
-                        image,
-                        results.pose_landmarks,
-                        mp_pose.POSE_CONNECTIONS,
-                        head_tilt=head_tilt,
-                        shoulder_tilt=shoulder_tilt,
-                        spine_angle=spine_angle
-                    )
-                    
-                    # Display metrics with color-coded text
-                    head_tilt_color = (0, 255, 0) if MIN_HEAD_THRESHOLD <= head_tilt <= MAX_HEAD_THRESHOLD else (0, 0, 255)
-                    shoulder_tilt_color = (0, 255, 0) if shoulder_tilt <= SHOULDER_THRESHOLD else (0, 0, 255)
-                    spine_angle_color = (0, 255, 0) if spine_angle >= SPINE_THRESHOLD else (0, 0, 255)
-                    
-                    cv2.putText(image, f"Head Tilt: {head_tilt:.1f}", (10, 30), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 1.0, head_tilt_color, 2)
-                    cv2.putText(image, f"Shoulder Tilt: {shoulder_tilt:.1f}", (10, 70), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 1.0, shoulder_tilt_color, 2)
-                    cv2.putText(image, f"Spine Angle: {spine_angle:.1f}", (10, 110), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 1.0, spine_angle_color, 2)
-                    
-                    # Display thresholds (only when FPS is high enough to reduce processing)
-                    if fps > 10:
-                        cv2.putText(image, f"Head Tilt Thresholds: {MIN_HEAD_THRESHOLD}-{MAX_HEAD_THRESHOLD}", (10, 150), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1)
-                        cv2.putText(image, f"Shoulder Tilt Threshold: {SHOULDER_THRESHOLD}", (10, 180), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1)
-                        cv2.putText(image, f"Spine Angle Threshold: {SPINE_THRESHOLD}", (10, 210), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1)
+                    landmarks = landmarksToArray(results.pose_landmarks)
+                    extrapolator.update(capture_time, landmarks)
                 else:
-                    # Add text to indicate no pose detected
-                    cv2.putText(image, "No pose detected", (10, 30), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
-                
-                # Display FPS
-                cv2.putText(image, f"FPS: {int(fps)}", (image.shape[1] - 120, 30), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                
-                # Store the processed frame in global variable
-                global_frame_var[0] = image
+                    landmarks = None
+                    extrapolator.reset()
                 
-                # Remove sleep delay to maximize FPS
+                # Log frame info occasionally
+                if processed_count % 100 == 0:
+                    logger.info(f"Processed {processed_count} frames, current FPS: {int(fps)}, "
+                                f"inference latency: {scheduler.latency or 0:.3f}s, skipped {dropped_count} stale frames")
+            else:
+                # Show the fresh frame with the landmarks carried forward from the last inferences
+                landmarks = extrapolator.predict(capture_time)
+            # Computed once per frame for the recorder, the overlay and the annotation
+            metrics = getPostureMetrics(landmarks, width, height) if landmarks is not None else None
+            # Only inferred poses are recorded, extrapolated ones would skew the summary
+            if inferred and metrics is not None and recorder is not None:
+                recorder.record(landmarks, width, height, capture_time, metrics)
+            
+            if overlay_hub is not None:
+                overlay_hub.publish((frame_count, landmarks, width, height, metrics))
+            
+            if annotate:
+                annotate_frame(image, landmarks, fps, metrics)
+            
+            # Publish the processed frame to streaming clients
+            frame_hub.publish(image)
     except Exception as e:
         logger.error(f"Error in process_video: {e}")
     finally:
         logger.info("Releasing camera")
-        cap.release()
+        capture.stop()
+        for pose in poses.values():
+            pose.close()
@@ -6,10 +6,9 @@ import argparse
 from datetime import timedelta
 from collections import deque
 import subprocess
+import threading
 # MediaPipe setup
 mp_pose = mp.solutions.pose
-mp_drawings = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
 
 # Custom JSON encoder to handle NumPy types
 class NumpyEncoder(json.JSONEncoder):
@@ -92,42 +91,242 @@ def getSpineAngle(results, img):
     
     return spine_angle
 
-def getHandGestureMetrics(results, img, hand_movement_history, window_size=30):
+# Landmarks tracked for gesture analysis, in ring buffer column order
+GESTURE_LANDMARKS = [
+    mp_pose.PoseLandmark.LEFT_WRIST,
+    mp_pose.PoseLandmark.RIGHT_WRIST,
+    mp_pose.PoseLandmark.LEFT_INDEX,
+    mp_pose.PoseLandmark.RIGHT_INDEX,
+    mp_pose.PoseLandmark.LEFT_SHOULDER,  # Added for height reference
+    mp_pose.PoseLandmark.RIGHT_SHOULDER,  # Added for height reference
+    mp_pose.PoseLandmark.LEFT_HIP,  # Added for height reference
+    mp_pose.PoseLandmark.RIGHT_HIP  # Added for height reference
+]
+LEFT_WRIST, RIGHT_WRIST = 0, 1
+LEFT_HIP, RIGHT_HIP = 6, 7
+
+class HandMovementBuffer:
+    """
+    Fixed-size ring buffer of gesture landmark positions.
+
+    Positions and validity masks are preallocated NumPy arrays. Wrist height and
+    wrist movement statistics are kept as running sums that are updated when a
+    frame enters or leaves the window, so every update is O(1).
+    """
+
+    def __init__(self, window_size=30):
+        self.window_size = window_size
+        self.positions = np.zeros((window_size, len(GESTURE_LANDMARKS), 2), dtype=np.float64)
+        self.valid = np.zeros((window_size, len(GESTURE_LANDMARKS)), dtype=bool)
+        # Left/right wrist movement of each entry relative to the entry before it
+        self.movement = np.zeros((window_size, 2), dtype=np.float64)
+        self.head = 0
+        self.count = 0
+        self.wrist_y_sum = 0.0
+        self.wrist_y_sq_sum = 0.0
+        self.wrist_y_count = 0
+        self.movement_sum = np.zeros(2, dtype=np.float64)
+
+    def __len__(self):
+        return self.count
+
+    def _oldest(self):
+        return (self.head - self.count) % self.window_size
+
+    def append(self, positions, valid):
+        """
+        Add the positions of the current frame, evicting the oldest frame if the window is full
+
+        Returns:
+            Left and right wrist movement relative to the previous frame
+        """
+        movement = np.zeros(2, dtype=np.float64)
+        if self.count > 0:
+            prev = (self.head - 1) % self.window_size
+            for side, idx in enumerate((LEFT_WRIST, RIGHT_WRIST)):
+                if valid[idx] and self.valid[prev, idx]:
+                    movement[side] = np.hypot(*(positions[idx] - self.positions[prev, idx]))
+
+        if self.count == self.window_size:
+            oldest = self.head
+            wrist_mask = self.valid[oldest, [LEFT_WRIST, RIGHT_WRIST]]
+            wrist_y = self.positions[oldest, [LEFT_WRIST, RIGHT_WRIST], 1][wrist_mask]
+            self.wrist_y_sum -= wrist_y.sum()
+            self.wrist_y_sq_sum -= np.square(wrist_y).sum()
+            self.wrist_y_count -= int(wrist_mask.sum())
+            self.movement_sum -= self.movement[oldest]
+            self.count -= 1
+
+        slot = self.head
+        self.positions[slot] = positions
+        self.valid[slot] = valid
+        self.movement[slot] = movement
+        wrist_mask = valid[[LEFT_WRIST, RIGHT_WRIST]]
+        wrist_y = positions[[LEFT_WRIST, RIGHT_WRIST], 1][wrist_mask]
+        self.wrist_y_sum += wrist_y.sum()
+        self.wrist_y_sq_sum += np.square(wrist_y).sum()
+        self.wrist_y_count += int(wrist_mask.sum())
+        self.movement_sum += movement
+
+        self.head = (self.head + 1) % self.window_size
+        self.count += 1
+        return movement
+
+    def height_variance(self):
+        """Variance of wrist heights (y-coordinates) over the window"""
+        if self.wrist_y_count == 0:
+            return None
+        mean = self.wrist_y_sum / self.wrist_y_count
+        return max(0.0, self.wrist_y_sq_sum / self.wrist_y_count - mean * mean)
+
+    def window_movement(self):
+        """
+        Wrist movement totals over the window
+
+        Returns:
+            Tuple of (total left movement, total right movement, number of frame-to-frame movements)
+        """
+        if self.count < 2:
+            return 0.0, 0.0, 0
+        # The oldest entry's movement refers to a frame that has already left the window
+        left, right = self.movement_sum - self.movement[self._oldest()]
+        return float(left), float(right), self.count - 1
+
+def format_timestamp(seconds):
+    """Format a time in seconds as H:MM:SS"""
+    return str(timedelta(seconds=int(seconds)))
+
+def add_timestamp_strings(intervals):
+    """Add start_time_str/end_time_str to intervals that only carry float times"""
+    for interval in intervals:
+        interval["start_time_str"] = format_timestamp(interval["start_time"])
+        if "end_time" in interval:
+            interval["end_time_str"] = format_timestamp(interval["end_time"])
+    return intervals
+
+def getIssueIntervals(timestamps, issue_mask, values, end_time, value_key, reduce=np.max):
+    """
+    Turn a per-frame issue mask into issue intervals
+
+    An interval starts at the first frame with the issue and ends at the next analyzed
+    frame without it, or at end_time if the issue lasts until the end.
+    """
+    intervals = []
+    if len(issue_mask) == 0:
+        return intervals
+    padded = np.concatenate(([False], issue_mask, [False]))
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    for start, stop in zip(changes[::2], changes[1::2]):
+        end = float(timestamps[stop]) if stop < len(timestamps) else float(end_time)
+        intervals.append({
+            "start_time": float(timestamps[start]),
+            value_key: float(reduce(values[start:stop])),
+            "end_time": end,
+            "duration": float(end - timestamps[start])
+        })
+    return intervals
+
+class PostureRecorder:
+    """
+    Columnar buffer of per-frame posture metrics.
+
+    Offline analysis and live sessions append one row per analyzed frame; summary()
+    derives the issue intervals and frame percentages from the columns in one pass.
+    """
+
+    def __init__(self, capacity=1024):
+        self._columns = np.empty((4, capacity), dtype=np.float64)
+        self.size = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, head_tilt, shoulder_tilt, spine_angle):
+        with self._lock:
+            if self.size == self._columns.shape[1]:
+                grown = np.empty((4, self.size * 2), dtype=np.float64)
+                grown[:, :self.size] = self._columns
+                self._columns = grown
+            self._columns[:, self.size] = (timestamp, head_tilt, shoulder_tilt, spine_angle)
+            self.size += 1
+
+    def reset(self):
+        with self._lock:
+            self.size = 0
+
+    def columns(self):
+        """Copy of the recorded (timestamps, head_tilt, shoulder_tilt, spine_angle) columns"""
+        with self._lock:
+            return self._columns[:, :self.size].copy()
+
+    def summary(self, end_time=None, max_head_threshold=110, min_head_threshold=90,
+                shoulder_threshold=20, spine_threshold=171):
+        """
+        Summarize the recorded frames like analyze_video does
+
+        Args:
+            end_time: Time at which open issues end, defaults to the last recorded timestamp
+
+        Returns:
+            Dictionary with thresholds, frame_statistics and head/shoulder/spine issue intervals
+        """
+        timestamps, head_tilt, shoulder_tilt, spine_angle = self.columns()
+        total = len(timestamps)
+        if end_time is None:
+            end_time = float(timestamps[-1]) if total else 0.0
+        
+        head_tilt_up = head_tilt > max_head_threshold
+        head_tilt_down = head_tilt < min_head_threshold
+        shoulder_issue = shoulder_tilt > shoulder_threshold
+        spine_issue = spine_angle < spine_threshold
+        
+        def percentage(mask):
+            return float(np.count_nonzero(mask) / total * 100) if total else 0.0
+        
+        return {
+            "thresholds": {
+                "max_head_tilt_degrees": float(max_head_threshold),
+                "min_head_tilt_degrees": float(min_head_threshold),
+                "shoulder_tilt_pixels": float(shoulder_threshold),
+                "spine_angle_degrees": float(spine_threshold)
+            },
+            "frame_statistics": {
+                "total_frames_analyzed": total,
+                "head_tilt_up_percentage": percentage(head_tilt_up),
+                "head_tilt_down_percentage": percentage(head_tilt_down),
+                "shoulder_tilt_percentage": percentage(shoulder_issue),
+                "spine_angle_percentage": percentage(spine_issue)
+            },
+            "head_tilt_issues": add_timestamp_strings(
+                getIssueIntervals(timestamps, head_tilt_up | head_tilt_down, head_tilt, end_time, "max_tilt")),
+            "shoulder_tilt_issues": add_timestamp_strings(
+                getIssueIntervals(timestamps, shoulder_issue, shoulder_tilt, end_time, "max_tilt")),
+            "spine_angle_issues": add_timestamp_strings(
+                getIssueIntervals(timestamps, spine_issue, spine_angle, end_time, "min_angle", reduce=np.min))
+        }
+
+def getHandGestureMetrics(results, img, hand_movement_history):
     """
     Analyze hand gestures and movement patterns for presentation assessment
     
     Args:
         results: MediaPipe pose detection results
         img: The current frame
-        hand_movement_history: Deque to track recent hand movements
-        window_size: Number of frames to analyze for movement patterns
+        hand_movement_history: HandMovementBuffer tracking recent hand movements
         
     Returns:
         Dictionary with hand gesture metrics
     """
     height, width, _ = img.shape
     
-    # Extract hand landmarks
-    landmarks = [
-        (mp_pose.PoseLandmark.LEFT_WRIST, "left_wrist"),
-        (mp_pose.PoseLandmark.RIGHT_WRIST, "right_wrist"),
-        (mp_pose.PoseLandmark.LEFT_INDEX, "left_index"),
-        (mp_pose.PoseLandmark.RIGHT_INDEX, "right_index"),
-        (mp_pose.PoseLandmark.LEFT_SHOULDER, "left_shoulder"),  # Added for height reference
-        (mp_pose.PoseLandmark.RIGHT_SHOULDER, "right_shoulder"),  # Added for height reference
-        (mp_pose.PoseLandmark.LEFT_HIP, "left_hip"),  # Added for height reference
-        (mp_pose.PoseLandmark.RIGHT_HIP, "right_hip")  # Added for height reference
-    ]
-    
-    current_positions = {}
+    positions = np.zeros((len(GESTURE_LANDMARKS), 2), dtype=np.float64)
+    valid = np.zeros(len(GESTURE_LANDMARKS), dtype=bool)
     
     # Get current landmark positions
-    for landmark_id, name in landmarks:
-        visibility = results.pose_landmarks.landmark[landmark_id].visibility
-        if visibility > 0.5:  # Only use visible landmarks
-            x = int(results.pose_landmarks.landmark[landmark_id].x * width) if results.pose_landmarks.landmark[landmark_id].x is not None else 0
-            y = int(results.pose_landmarks.landmark[landmark_id].y * height) if results.pose_landmarks.landmark[landmark_id].y is not None else 0
-            current_positions[name] = (x, y)
+    for idx, landmark_id in enumerate(GESTURE_LANDMARKS):
+        landmark = results.pose_landmarks.landmark[landmark_id]
+        if landmark.visibility > 0.5:  # Only use visible landmarks
+            positions[idx, 0] = int(landmark.x * width) if landmark.x is not None else 0
+            positions[idx, 1] = int(landmark.y * height) if landmark.y is not None else 0
+            valid[idx] = True
     
     # Initialize metrics
     metrics = {
@@ -143,51 +342,18 @@ def getHandGestureMetrics(results, img, hand_movement_history, window_size=30):
     }
     
     # Check if hands are at appropriate level (above hip)
-    hands_at_proper_height = False
-    
-    if ("left_wrist" in current_positions and "left_hip" in current_positions):
-        # Check if left hand is above hip
-        wrist_y = current_positions["left_wrist"][1]
-        hip_y = current_positions["left_hip"][1]
-        
-        # Hand should be above hip level
-        left_hand_proper_height = wrist_y < hip_y
-        
-        if left_hand_proper_height:
-            hands_at_proper_height = True
-    
-    if ("right_wrist" in current_positions and "right_hip" in current_positions):
-        # Same check for right hand
-        wrist_y = current_positions["right_wrist"][1]
-        hip_y = current_positions["right_hip"][1]
-        
-        right_hand_proper_height = wrist_y < hip_y
-        
-        if right_hand_proper_height:
-            hands_at_proper_height = True
+    left_hand_proper_height = valid[LEFT_WRIST] and valid[LEFT_HIP] and positions[LEFT_WRIST, 1] < positions[LEFT_HIP, 1]
+    right_hand_proper_height = valid[RIGHT_WRIST] and valid[RIGHT_HIP] and positions[RIGHT_WRIST, 1] < positions[RIGHT_HIP, 1]
+    hands_at_proper_height = bool(left_hand_proper_height or right_hand_proper_height)
     
     metrics["hands_at_chest_level"] = hands_at_proper_height
     
+    # Add current positions to the window and get movement since the previous frame
+    had_history = len(hand_movement_history) > 0
+    left_movement, right_movement = hand_movement_history.append(positions, valid)
+    
     # If we have previous positions to compare with
-    if len(hand_movement_history) > 0:
-        prev_positions = hand_movement_history[-1]
-        
-        # Calculate movement for each tracked point
-        left_movement = 0
-        right_movement = 0
-        
-        if "left_wrist" in current_positions and "left_wrist" in prev_positions:
-            left_movement = np.hypot(
-                current_positions["left_wrist"][0] - prev_positions["left_wrist"][0],
-                current_positions["left_wrist"][1] - prev_positions["left_wrist"][1]
-            )
-            
-        if "right_wrist" in current_positions and "right_wrist" in prev_positions:
-            right_movement = np.hypot(
-                current_positions["right_wrist"][0] - prev_positions["right_wrist"][0],
-                current_positions["right_wrist"][1] - prev_positions["right_wrist"][1]
-            )
-            
+    if had_history:
         # Update metrics
         metrics["left_hand_movement"] = float(left_movement)
         metrics["right_hand_movement"] = float(right_movement)
@@ -207,56 +373,16 @@ def getHandGestureMetrics(results, img, hand_movement_history, window_size=30):
         else:
             metrics["dominant_hand"] = "both"
     
-    # Add current positions to history
-    hand_movement_history.append(current_positions)
-    if len(hand_movement_history) > window_size:
-        hand_movement_history.popleft()
-    
     # Analyze movement patterns over the window
-    if len(hand_movement_history) >= window_size // 2:
+    if len(hand_movement_history) >= hand_movement_history.window_size // 2:
         # Calculate variance in hand height (y-coordinate)
-        height_values = []
-        
-        for positions in hand_movement_history:
-            for hand in ["left_wrist", "right_wrist"]:
-                if hand in positions:
-                    height_values.append(positions[hand][1])
-        
-        if height_values:
-            metrics["hand_height_variance"] = float(np.var(height_values))
+        height_variance = hand_movement_history.height_variance()
+        if height_variance is not None:
+            metrics["hand_height_variance"] = float(height_variance)
         
         # Calculate average movement over the window
-        total_movements = []
-        total_left_movement = 0
-        total_right_movement = 0
-        movement_count = 0
-        
-        for i in range(1, len(hand_movement_history)):
-            prev = hand_movement_history[i-1]
-            curr = hand_movement_history[i]
-            movement = 0
-            
-            # Track cumulative hand movements
-            if "left_wrist" in curr and "left_wrist" in prev:
-                left_move = np.hypot(
-                    curr["left_wrist"][0] - prev["left_wrist"][0],
-                    curr["left_wrist"][1] - prev["left_wrist"][1]
-                )
-                movement += left_move
-                total_left_movement += left_move
-            
-            if "right_wrist" in curr and "right_wrist" in prev:
-                right_move = np.hypot(
-                    curr["right_wrist"][0] - prev["right_wrist"][0],
-                    curr["right_wrist"][1] - prev["right_wrist"][1]
-                )
-                movement += right_move
-                total_right_movement += right_move
-            
-            total_movements.append(movement)
-            movement_count += 1
-        
-        avg_movement = np.mean(total_movements) if total_movements else 0
+        total_left_movement, total_right_movement, movement_count = hand_movement_history.window_movement()
+        avg_movement = (total_left_movement + total_right_movement) / movement_count if movement_count else 0
         
         # Update dominant hand across the window
         if movement_count > 0:
@@ -295,7 +421,8 @@ def analyze_video(video_path, output_path, max_head_threshold=110, min_head_thre
         shoulder_threshold: Threshold for shoulder tilt in pixels
         spine_threshold: Threshold for spine angle in degrees (below this is an issue - indicates bent spine)
         gesture_analysis: Whether to analyze hand gestures
-        visualize: Whether to display the video with landmarks during processing
+        visualize: Whether to display the video with landmarks during processing. When False the
+            analysis runs headless: no drawing, per-frame string formatting or window calls
         precise_output_path: Path to save the precise summary JSON (if None, no precise summary is generated)
     """
     cap = cv2.VideoCapture(video_path)
@@ -334,14 +461,12 @@ def analyze_video(video_path, output_path, max_head_threshold=110, min_head_thre
         }
     }
     
-    # For tracking consecutive frames with issues
-    current_head_issue = None
-    current_shoulder_issue = None
-    current_spine_issue = None
+    # Per-frame posture metrics, summarized into issue intervals at the end
+    posture_recorder = PostureRecorder()
     current_gesture_segment = None
     
     # For tracking gesture patterns
-    hand_movement_history = deque(maxlen=60)  # About 2 seconds at 30fps
+    hand_movement_history = HandMovementBuffer(window_size=30)  # About 1 second at 30fps
     gesture_segment_min_duration = 3  # Minimum seconds for a gesture segment
     
     # For overall statistics
@@ -355,14 +480,11 @@ def analyze_video(video_path, output_path, max_head_threshold=110, min_head_thre
     frames_with_right_hand = 0
     frames_with_both_hands = 0
     
-    # For tracking issue statistics
-    frames_with_head_tilt_up = 0  # Head tilt > max_head_threshold
-    frames_with_head_tilt_down = 0  # Head tilt < min_head_threshold
-    frames_with_shoulder_tilt = 0
-    frames_with_spine_angle = 0
-    
-    # Setup visualization window if needed
+    # Setup visualization window if needed. Headless runs (visualize=False) never
+    # load the drawing utilities or do any per-frame annotation work.
     if visualize:
+        mp_drawings = mp.solutions.drawing_utils
+        mp_drawing_styles = mp.solutions.drawing_styles
         cv2.namedWindow('Presentation Analysis', cv2.WINDOW_NORMAL)
     
     with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
@@ -375,6 +497,7 @@ def analyze_video(video_path, output_path, max_head_threshold=110, min_head_thre
                 
             # Convert the image and process with MediaPipe
             img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            img_rgb.flags.writeable = False
             results = pose.process(img_rgb)
             
             # If pose detected
@@ -387,71 +510,8 @@ def analyze_video(video_path, output_path, max_head_threshold=110, min_head_thre
                 
                 # Current timestamp
                 timestamp = float(frame_idx / fps)
-                timestamp_str = str(timedelta(seconds=int(timestamp)))
-                
-                # Check for head tilt issues - consider min_head_threshold to max_head_threshold degrees as normal
-                head_tilt_issue = head_tilt > max_head_threshold or head_tilt < min_head_threshold
-                
-                # Track specific issue types for precise summary
-                if head_tilt > max_head_threshold:
-                    frames_with_head_tilt_up += 1
-                elif head_tilt < min_head_threshold:
-                    frames_with_head_tilt_down += 1
-                
-                if shoulder_tilt > shoulder_threshold:
-                    frames_with_shoulder_tilt += 1
-                
-                # Check for spine angle issues - spine_angle < threshold indicates bent spine
-                if spine_angle < spine_threshold:
-                    frames_with_spine_angle += 1
-                    if current_spine_issue is None:
-                        current_spine_issue = {
-                            "start_time": float(timestamp),
-                            "start_time_str": timestamp_str,
-                            "min_angle": float(spine_angle)  # Track minimum angle (most bent)
-                        }
-                    else:
-                        current_spine_issue["min_angle"] = float(min(current_spine_issue.get("min_angle", float('inf')), spine_angle))
-                elif current_spine_issue is not None:
-                    current_spine_issue["end_time"] = float(timestamp)
-                    current_spine_issue["end_time_str"] = timestamp_str
-                    current_spine_issue["duration"] = float(current_spine_issue["end_time"] - current_spine_issue["start_time"])
-                    analysis_results["spine_angle_issues"].append(current_spine_issue)
-                    current_spine_issue = None
-                
-                if head_tilt_issue:
-                    if current_head_issue is None:
-                        current_head_issue = {
-                            "start_time": float(timestamp),
-                            "start_time_str": timestamp_str,
-                            "max_tilt": float(head_tilt)
-                        }
-                    else:
-                        current_head_issue["max_tilt"] = float(max(current_head_issue["max_tilt"], head_tilt))
-                elif current_head_issue is not None:
-                    current_head_issue["end_time"] = float(timestamp)
-                    current_head_issue["end_time_str"] = timestamp_str
-                    current_head_issue["duration"] = float(current_head_issue["end_time"] - current_head_issue["start_time"])
-                    analysis_results["head_tilt_issues"].append(current_head_issue)
-                    current_head_issue = None
                 
-                # Check for shoulder tilt issues
-                # Check for shoulder tilt issues
-                if shoulder_tilt > shoulder_threshold:
-                    if current_shoulder_issue is None:
-                        current_shoulder_issue = {
-                            "start_time": float(timestamp),
-                            "start_time_str": timestamp_str,
-                            "max_tilt": float(shoulder_tilt)
-                        }
-                    else:
-                        current_shoulder_issue["max_tilt"] = float(max(current_shoulder_issue["max_tilt"], shoulder_tilt))
-                elif current_shoulder_issue is not None:
-                    current_shoulder_issue["end_time"] = float(timestamp)
-                    current_shoulder_issue["end_time_str"] = timestamp_str
-                    current_shoulder_issue["duration"] = float(current_shoulder_issue["end_time"] - current_shoulder_issue["start_time"])
-                    analysis_results["shoulder_tilt_issues"].append(current_shoulder_issue)
-                    current_shoulder_issue = None
+                posture_recorder.append(timestamp, head_tilt, shoulder_tilt, spine_angle)
                 
                 # Gesture analysis
                 if gesture_analysis:
@@ -480,14 +540,12 @@ def analyze_video(video_path, output_path, max_head_threshold=110, min_head_thre
                             segment_duration = timestamp - current_gesture_segment["start_time"]
                             if segment_duration >= gesture_segment_min_duration:
                                 current_gesture_segment["end_time"] = float(timestamp)
-                                current_gesture_segment["end_time_str"] = timestamp_str
                                 current_gesture_segment["duration"] = float(segment_duration)
                                 analysis_results["gesture_analysis"]["segments"].append(current_gesture_segment)
                         
                         # Start new segment
                         current_gesture_segment = {
                             "start_time": float(timestamp),
-                            "start_time_str": timestamp_str,
                             "quality": gesture_metrics["gesture_quality"],
                             "avg_movement": float(gesture_metrics["total_movement"]),
                             "dominant_hand": gesture_metrics["dominant_hand"]  # Add dominant hand to segment
@@ -503,8 +561,8 @@ def analyze_video(video_path, output_path, max_head_threshold=110, min_head_thre
                 
                 # Visualize if needed
                 if visualize:
-                    # Draw landmarks
-                    annotated_img = img.copy()
+                    # Draw landmarks directly on the frame, it is not used after this point
+                    annotated_img = img
                     mp_drawings.draw_landmarks(
                         annotated_img,
                         results.pose_landmarks,
@@ -536,7 +594,7 @@ def analyze_video(video_path, output_path, max_head_threshold=110, min_head_thre
                         cv2.putText(annotated_img, f"Hand: {gesture_metrics['dominant_hand']}", (10, 190), 
                                     cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
                     
-                    cv2.putText(annotated_img, f"Time: {timestamp_str}", (10, 230), 
+                    cv2.putText(annotated_img, f"Time: {format_timestamp(timestamp)}", (10, 230), 
                                 cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
                     
                     cv2.imshow('Presentation Analysis', annotated_img)
@@ -552,36 +610,29 @@ def analyze_video(video_path, output_path, max_head_threshold=110, min_head_thre
     
     # Handle any issues still in progress at the end of the video
     timestamp = float(frame_idx / fps)
-    timestamp_str = str(timedelta(seconds=int(timestamp)))
-    
-    # Finalize posture issues
-    if current_head_issue is not None:
-        current_head_issue["end_time"] = float(timestamp)
-        current_head_issue["end_time_str"] = timestamp_str
-        current_head_issue["duration"] = float(current_head_issue["end_time"] - current_head_issue["start_time"])
-        analysis_results["head_tilt_issues"].append(current_head_issue)
-    
-    if current_shoulder_issue is not None:
-        current_shoulder_issue["end_time"] = float(timestamp)
-        current_shoulder_issue["end_time_str"] = timestamp_str
-        current_shoulder_issue["duration"] = float(current_shoulder_issue["end_time"] - current_shoulder_issue["start_time"])
-        analysis_results["shoulder_tilt_issues"].append(current_shoulder_issue)
-    
-    if current_spine_issue is not None:
-        current_spine_issue["end_time"] = float(timestamp)
-        current_spine_issue["end_time_str"] = timestamp_str
-        current_spine_issue["duration"] = float(current_spine_issue["end_time"] - current_spine_issue["start_time"])
-        analysis_results["spine_angle_issues"].append(current_spine_issue)
+    
+    # Summarize posture issues, open issues end with the video
+    posture_summary = posture_recorder.summary(
+        end_time=timestamp,
+        max_head_threshold=max_head_threshold,
+        min_head_threshold=min_head_threshold,
+        shoulder_threshold=shoulder_threshold,
+        spine_threshold=spine_threshold
+    )
+    for issue_type in ("head_tilt_issues", "shoulder_tilt_issues", "spine_angle_issues"):
+        analysis_results[issue_type] = posture_summary[issue_type]
     
     # Finalize gesture segment
     if gesture_analysis and current_gesture_segment is not None:
         segment_duration = timestamp - current_gesture_segment["start_time"]
         if segment_duration >= gesture_segment_min_duration:
             current_gesture_segment["end_time"] = float(timestamp)
-            current_gesture_segment["end_time_str"] = timestamp_str
             current_gesture_segment["duration"] = float(segment_duration)
             analysis_results["gesture_analysis"]["segments"].append(current_gesture_segment)
     
+    # Human-readable times are only needed for the final results
+    add_timestamp_strings(analysis_results["gesture_analysis"]["segments"])
+    
     # Calculate overall gesture assessment and hand dominance
     if gesture_analysis and total_frames_analyzed > 0:
         gesture_percentage_good = (frames_with_good_gestures / total_frames_analyzed) * 100
@@ -670,13 +721,7 @@ def analyze_video(video_path, output_path, max_head_threshold=110, min_head_thre
         precise_summary = {
             "video_info": analysis_results["video_info"],
             "thresholds": analysis_results["thresholds"],
-            "frame_statistics": {
-                "total_frames_analyzed": total_frames_analyzed,
-                "head_tilt_up_percentage": float((frames_with_head_tilt_up / total_frames_analyzed) * 100),
-                "head_tilt_down_percentage": float((frames_with_head_tilt_down / total_frames_analyzed) * 100),
-                "shoulder_tilt_percentage": float((frames_with_shoulder_tilt / total_frames_analyzed) * 100),
-                "spine_angle_percentage": float((frames_with_spine_angle / total_frames_analyzed) * 100)
-            }
+            "frame_statistics": posture_summary["frame_statistics"]
         }
         
         # Add gesture statistics if analyzed
@@ -1,14 +1,179 @@
+import io
 import re
-from pydub import AudioSegment
 import os
-import soundfile as sf
-import shutil
+import queue
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+from tts_cache import get_tts_cache
+from tts_encoding import DEFAULT_FORMAT, encode_audio, get_format, iter_encoded
+
+SAMPLE_RATE = 24000
+VOICE = 'af_heart'
+SPEED = 1
+# Number of chunks synthesized concurrently, each worker uses its own pipeline
+TTS_WORKERS = int(os.getenv('TTS_WORKERS', '2'))
 
 def get_pipeline():
     from kokoro import KPipeline
     pipeline = KPipeline(lang_code='a')
     return pipeline
 
+class PipelinePool:
+    """
+    Pool of Kokoro pipelines shared by synthesis workers.
+
+    Pipelines are expensive to load, so they are created lazily up to size and
+    reused across requests, and each one is used by a single worker at a time.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    @contextmanager
+    def pipeline(self):
+        try:
+            pipeline = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    pipeline = get_pipeline()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                pipeline = self._idle.get()
+        try:
+            yield pipeline
+        finally:
+            self._idle.put(pipeline)
+
+_pipeline_pool = None
+_pipeline_pool_lock = threading.Lock()
+
+def get_pipeline_pool():
+    global _pipeline_pool
+    with _pipeline_pool_lock:
+        if _pipeline_pool is None:
+            _pipeline_pool = PipelinePool(max(1, TTS_WORKERS))
+        return _pipeline_pool
+
+def _to_numpy(audio):
+    if hasattr(audio, 'cpu'):
+        audio = audio.cpu().numpy()
+    return np.asarray(audio, dtype=np.float32).reshape(-1)
+
+def synthesize_chunk(chunk, voice=VOICE, speed=SPEED):
+    """Synthesize one chunk, or load it from the TTS cache, and return its samples as a float32 array"""
+    cache = get_tts_cache()
+    if cache is not None:
+        audio = cache.get(voice, speed, chunk)
+        if audio is not None:
+            return audio
+    audio = _synthesize_chunk(chunk, voice, speed)
+    if cache is not None:
+        cache.put(voice, speed, chunk, audio)
+    return audio
+
+def _synthesize_chunk(chunk, voice, speed):
+    with get_pipeline_pool().pipeline() as pipeline:
+        print(f"Converting to speech: {chunk}")
+        generator = pipeline(
+            chunk, voice=voice,
+            speed=speed, split_pattern=r'\n+')
+        parts = [_to_numpy(audio) for gs, ps, audio in generator]
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+def synthesize_chunks(chunks, workers=None, voice=VOICE, speed=SPEED):
+    """
+    Synthesize chunks, concurrently when workers > 1
+
+    Returns:
+        List of float32 arrays in the same order as chunks
+    """
+    workers = TTS_WORKERS if workers is None else workers
+    if workers <= 1 or len(chunks) <= 1:
+        return [synthesize_chunk(chunk, voice, speed) for chunk in chunks]
+    with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        return list(executor.map(lambda chunk: synthesize_chunk(chunk, voice, speed), chunks))
+
+def iter_speech(chunks, workers=None, voice=VOICE, speed=SPEED):
+    """
+    Yield the audio of each chunk, in order, as soon as it is synthesized
+
+    Later chunks keep synthesizing in the background while earlier ones are
+    consumed. Pending chunks are cancelled if the consumer stops early.
+    """
+    workers = TTS_WORKERS if workers is None else workers
+    if workers <= 1:
+        for chunk in chunks:
+            yield synthesize_chunk(chunk, voice, speed)
+        return
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(synthesize_chunk, chunk, voice, speed) for chunk in chunks]
+        for future in futures:
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def to_pcm16(audio):
+    """Convert float samples in [-1, 1] to 16-bit PCM bytes"""
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+def wav_header(sample_rate=SAMPLE_RATE, channels=1, bits_per_sample=16, data_size=None):
+    """
+    RIFF/WAVE header for PCM audio
+
+    With data_size=None the sizes are set to the maximum value, which players
+    treat as a stream of unknown length.
+    """
+    byte_rate = sample_rate * channels * bits_per_sample // 8
+    block_align = channels * bits_per_sample // 8
+    if data_size is None:
+        data_size = 0xFFFFFFFF - 36
+    return struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', data_size + 36, b'WAVE', b'fmt ', 16, 1, channels,
+                       sample_rate, byte_rate, block_align, bits_per_sample, b'data', data_size)
+
+def stream_wav(text, workers=None):
+    """Yield a streaming WAV header followed by the PCM audio of each chunk as it is ready"""
+    chunks = split_text_for_tts(text)
+    print(f"Streaming {len(chunks)} chunks")
+    yield wav_header()
+    for audio in iter_speech(chunks, workers):
+        yield to_pcm16(audio)
+
+def stream_speech(text, fmt=DEFAULT_FORMAT, workers=None):
+    """Yield the speech encoded in fmt, encoding each chunk as soon as it is synthesized"""
+    fmt = get_format(fmt)
+    if fmt == 'wav':
+        yield from stream_wav(text, workers)
+        return
+    chunks = split_text_for_tts(text)
+    print(f"Streaming {len(chunks)} chunks as {fmt}")
+    yield from iter_encoded(iter_speech(chunks, workers), fmt, SAMPLE_RATE)
+
+def concatenate_audio(parts):
+    """Copy the chunk arrays, in order, into one preallocated output buffer"""
+    output = np.empty(sum(len(part) for part in parts), dtype=np.float32)
+    offset = 0
+    for part in parts:
+        output[offset:offset + len(part)] = part
+        offset += len(part)
+    return output
+
 def split_text_for_tts(text, max_words=29, max_chars=204):
     paragraphs = text.split('\n')
     chunks = []
@@ -44,10 +209,13 @@ def split_text_for_tts(text, max_words=29, max_chars=204):
     
     return chunks
 
-def process_text_to_speech(text, output_dir="output_audio", final_output="combined_speech.wav"):
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
+def process_text_to_speech(text, final_output="combined_speech.wav", workers=None, fmt=DEFAULT_FORMAT):
+    """
+    Synthesize text and write it in the given format to final_output.
+
+    final_output may be a path or a writable file-like object, nothing else is
+    written to disk so concurrent calls do not share any state.
+    """
     chunks = split_text_for_tts(text)
     
     print(f"Text split into {len(chunks)} chunks")
@@ -58,46 +226,25 @@ def process_text_to_speech(text, output_dir="output_audio", final_output="combin
         if word_count > 29 or char_count > 204:
             print(f"  WARNING: Chunk {i} exceeds limits ({word_count} words, {char_count} chars)")
     
-    pipeline = get_pipeline()
+    audio = concatenate_audio(synthesize_chunks(chunks, workers))
     
-    audio_files = []
-    for i, chunk in enumerate(chunks):
-        output_file = os.path.join(output_dir, f"chunk_{i:03d}.wav")
-        
-        print(f"Converting to speech: {chunk}")
-        generator = pipeline(
-            chunk, voice='af_heart',
-            speed=1, split_pattern=r'\n+')
-        
-        for i, (gs, ps, audio) in enumerate(generator):
-            sf.write(output_file, audio, 24000)
-        
-        audio_files.append(output_file)
-    
-    combined = AudioSegment.empty()
-    for audio_file in audio_files:
-        segment = AudioSegment.from_wav(audio_file)
-        combined += segment
-    
-    combined.export(final_output, format="wav")
+    if isinstance(final_output, str):
+        with open(final_output, 'wb') as output:
+            output.write(encode_audio(audio, fmt, SAMPLE_RATE).getbuffer())
+    else:
+        final_output.write(encode_audio(audio, fmt, SAMPLE_RATE).getbuffer())
     
     return final_output
 
-def get_audio(text):
+def get_audio(text, fmt=DEFAULT_FORMAT):
+    """Return the synthesized speech as an in-memory file in the given format, positioned at the start"""
     try:
-        import uuid
-        final_output = f"speech_{uuid.uuid4()}.wav"
-        
-        final_audio = process_text_to_speech(text, 
-                                            output_dir="output_audio", 
-                                            final_output=final_output)
-        
-        print(f"Speech generation complete! Final audio saved to: {final_audio}")
+        final_audio = process_text_to_speech(text, final_output=io.BytesIO(), fmt=fmt)
+        final_audio.seek(0)
         
-        if os.path.exists("output_audio"):
-            shutil.rmtree("output_audio")
+        print(f"Speech generation complete! {final_audio.getbuffer().nbytes} bytes of audio")
             
-        return os.path.abspath(final_audio)
+        return final_audio
     except Exception as e:
         print(f"Error in get_audio: {str(e)}")
         raise
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import asyncio
+import random
+import bisect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+LANGFLOW_BASE_URL = os.getenv('LANGFLOW_BASE_URL', "https://api.langflow.astra.datastax.com")
+LANGFLOW_ID = os.getenv('LANGFLOW_ID')
+APPLICATION_TOKEN = os.getenv('LANGFLOW_API_KEY')
+CONNECT_TIMEOUT = float(os.getenv('LANGFLOW_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('LANGFLOW_READ_TIMEOUT', '120'))
+MAX_RETRIES = int(os.getenv('LANGFLOW_MAX_RETRIES', '2'))
+BACKOFF_SECONDS = float(os.getenv('LANGFLOW_BACKOFF_SECONDS', '0.5'))
+MAX_BACKOFF_SECONDS = float(os.getenv('LANGFLOW_MAX_BACKOFF_SECONDS', '8'))
+POOL_SIZE = int(os.getenv('LANGFLOW_POOL_SIZE', '10'))
+# Flow runs allowed in flight at once from one async batch
+MAX_CONCURRENCY = int(os.getenv('LANGFLOW_MAX_CONCURRENCY', str(POOL_SIZE)))
+
+# Statuses worth retrying, anything else is returned or raised straight away
+RETRY_STATUSES = {429, 502, 503, 504}
+# Upper bounds of the latency histogram buckets in seconds, LLM flows take seconds to minutes
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+class LangflowError(Exception):
+    """Raised when a flow run fails after all retries or returns an unexpected response"""
+
+def extract_text(response):
+    """Text of the first output of a flow run response"""
+    try:
+        return response['outputs'][0]['outputs'][0]['results']['text']['text']
+    except (KeyError, IndexError, TypeError) as e:
+        raise LangflowError(f"Unexpected flow response: {str(response)[:200]}") from e
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed bucket bounds"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile, None above the last bound"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_seconds": self.total / self.count if self.count else None,
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+            "buckets": {f"le_{bound}": count for bound, count in zip(self.buckets, self.counts)},
+            "overflow": self.counts[-1]
+        }
+
+class LangflowClient:
+    """
+    Langflow flow runner sharing one pooled keep-alive session.
+
+    Requests use separate connect and read timeouts, connection errors,
+    timeouts and retryable statuses are retried with full-jitter exponential
+    backoff, and every attempt is recorded in a per-endpoint latency histogram.
+    """
+
+    def __init__(self, base_url=LANGFLOW_BASE_URL, langflow_id=LANGFLOW_ID, token=APPLICATION_TOKEN,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, max_retries=MAX_RETRIES,
+                 backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS, pool_size=POOL_SIZE):
+        self.base_url = base_url.rstrip('/')
+        self.langflow_id = langflow_id
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Content-Type'] = 'application/json'
+        if token:
+            self.session.headers['Authorization'] = "Bearer " + token
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._retries = {}
+        self._errors = {}
+
+    def api_url(self, endpoint):
+        # DataStax hosted flows are namespaced by the Langflow id, self-hosted servers are not
+        if self.langflow_id:
+            return f"{self.base_url}/lf/{self.langflow_id}/api/v1/run/{endpoint}"
+        return f"{self.base_url}/api/v1/run/{endpoint}"
+
+    def _record(self, endpoint, seconds=None, retried=False, failed=False):
+        with self._lock:
+            if seconds is not None:
+                self._histograms.setdefault(endpoint, LatencyHistogram()).observe(seconds)
+            if retried:
+                self._retries[endpoint] = self._retries.get(endpoint, 0) + 1
+            if failed:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+
+    def _backoff_delay(self, attempt, response=None):
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return min(float(response.headers['Retry-After']), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def post(self, endpoint, payload, **kwargs):
+        """
+        POST a payload to a flow endpoint with retries
+
+        Args:
+            endpoint: Flow id or endpoint name
+            payload: JSON body of the run request
+            **kwargs: Extra arguments for requests, e.g. stream=True
+
+        Returns:
+            The successful requests.Response
+        """
+        url = self.api_url(endpoint)
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            response = None
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, **kwargs)
+                error = None if response.status_code not in RETRY_STATUSES else f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            self._record(endpoint, seconds=time.perf_counter() - start)
+            if error is None:
+                if not response.ok:
+                    self._record(endpoint, failed=True)
+                    raise LangflowError(f"Flow {endpoint} failed with HTTP {response.status_code}: {response.text[:200]}")
+                return response
+            if attempt == self.max_retries:
+                self._record(endpoint, failed=True)
+                raise LangflowError(f"Flow {endpoint} failed after {attempt + 1} attempts: {error}")
+            delay = self._backoff_delay(attempt, response)
+            print(f"Langflow {endpoint} attempt {attempt + 1} failed ({error}), retrying in {delay:.2f}s")
+            self._record(endpoint, retried=True)
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+
+    def run(self, endpoint, message, tweaks=None, output_type="chat", input_type="chat"):
+        """Run a flow and return the parsed JSON response"""
+        payload = {
+            "input_value": message,
+            "output_type": output_type,
+            "input_type": input_type,
+        }
+        if tweaks:
+            payload["tweaks"] = tweaks
+        response = self.post(endpoint, payload)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise LangflowError(f"Flow {endpoint} returned invalid JSON: {response.text[:200]}") from e
+
+    def run_text(self, endpoint, message, tweaks=None, output_type="chat", input_type="chat"):
+        """Run a flow and return the text of its first output"""
+        return extract_text(self.run(endpoint, message, tweaks, output_type, input_type))
+
+    def stream(self, endpoint, message, tweaks=None, output_type="chat", input_type="chat"):
+        """
+        Run a flow in streaming mode
+
+        Yields:
+            Event dicts from Langflow, e.g. {"event": "token", "data": {"chunk": ...}}
+            while the LLM generates and {"event": "end", "data": {"result": ...}} last
+        """
+        payload = {
+            "input_value": message,
+            "output_type": output_type,
+            "input_type": input_type,
+        }
+        if tweaks:
+            payload["tweaks"] = tweaks
+        response = self.post(endpoint, payload, params={"stream": "true"}, stream=True)
+        with response:
+            # Without a charset iter_lines yields bytes, and text/event-stream would be decoded as ISO-8859-1
+            response.encoding = 'utf-8'
+            for line in response.iter_lines(decode_unicode=True):
+                line = line.strip() if line else ''
+                if line.startswith('data:'):
+                    line = line[len('data:'):].strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    print(f"Skipping malformed Langflow stream line: {line[:200]}")
+
+    def metrics(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    "latency": histogram.snapshot(),
+                    "retries": self._retries.get(endpoint, 0),
+                    "errors": self._errors.get(endpoint, 0)
+                }
+                for endpoint, histogram in self._histograms.items()
+            }
+
+    def close(self):
+        self.session.close()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_langflow_client():
+    """Process-wide client so all flow runs share the connection pool"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LangflowClient()
+        return _client
+
+class AsyncLangflowClient:
+    """
+    asyncio front end over the pooled client.
+
+    Runs execute on a thread pool sized to max_concurrency using the shared
+    session, and a semaphore caps how many are in flight so a large batch
+    cannot exhaust the connection pool. Create one per event loop.
+    """
+
+    def __init__(self, client=None, max_concurrency=MAX_CONCURRENCY):
+        self.client = client or get_langflow_client()
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='langflow')
+
+    async def run_text(self, endpoint, message, tweaks=None, output_type="chat", input_type="chat"):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.client.run_text, endpoint, message, tweaks,
+                                              output_type, input_type)
+
+    async def run_many(self, endpoint, runs):
+        """
+        Run several (message, tweaks) pairs against one flow concurrently
+
+        Returns:
+            Results in the order of runs, failed runs are returned as their exception
+        """
+        return await asyncio.gather(*(self.run_text(endpoint, message, tweaks) for message, tweaks in runs),
+                                    return_exceptions=True)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -2,61 +2,129 @@
 
 
 import json
-import requests
-from dotenv import load_dotenv
+import asyncio
 import os
-load_dotenv()
+from qa_index import get_question_bank
+from reference_index import get_reference_index
+from qa_scoring import score_answer
+from langflow_client import MAX_CONCURRENCY, AsyncLangflowClient, get_langflow_client
 question = "What is the difference between compilation and interpretation?Also explain the use of branching in version control."
 user_answer = "compilation means running the code and interpreting means translating the code into another language."
 
-BASE_API_URL = "https://api.langflow.astra.datastax.com"
-LANGFLOW_ID = os.getenv('LANGFLOW_ID')
-FLOW_ID = os.getenv('FLOW_ID')
-APPLICATION_TOKEN = os.getenv('LANGFLOW_API_KEY')
 ENDPOINT = "question_answer" 
+# Flow used when the reference answer was found locally. Point it at a copy of the flow without the
+# vector store retriever to skip remote retrieval; by default the main flow is used and still retrieves.
+SCORING_ENDPOINT = os.getenv('LANGFLOW_QA_SCORING_ENDPOINT', ENDPOINT)
+QA_CRITERIA = "\nEvaluate the user's answer for correctness, completeness, and relevance.\nProvide a similarity score from 0 to 100 and a short justification.\nYour response should be in a json format and should consist of the following fields:\njson(\n\"score\":\"\"\n\"feedback\":\"<brief explanation of why this score was given>\"\n\"missing_points\":\"<if applicable,consists of key details missing in the user's answer compared to the retrieved answer>\"\n\"suggestions\":\"\"<what improvements should the user enforce to better his/her answer>\"\n\"resources\":\"<Provide the necessary references or materials the user should consult to accurately answer the question. Make sure to provide links to every resource>\"\n\"correct_answer\":\"<a comprehensive correct answer to the question asked based on the retrieved_answer>\"\n)\n\nEvaluation Criteria:\n\n1)Factual Accuracy – Is the user's answer factually correct?\n2)Completeness – Does the user's answer cover all key points in the reference answer?\n3)Relevance – Is the response focused on answering the question?\n\nquestion = {question}\nretrieved_answer={retrieved_answer}\nuser_answer = {user_answer}"
+QA_TEMPLATE = "You are an AI evaluator that checks if a user's answer is correct by comparing it with a reference answer from a document.You are given the question asked to an interviewee and the answer given by the the interviewee as input.Use retrieval augmented generation(RAG) to retreive the relevant answer to the question from the document.Check the similarity between the user's response(user_answer) and the response you got from the document using RAG(retrieved_answer)." + QA_CRITERIA
+# Same evaluation against a reference answer passed in the prompt, without the RAG instruction
+QA_SCORING_TEMPLATE = "You are an AI evaluator that checks if a user's answer is correct by comparing it with a reference answer.You are given the question asked to an interviewee, the reference answer(retrieved_answer) and the answer given by the the interviewee as input.Check the similarity between the user's response(user_answer) and the reference answer(retrieved_answer)." + QA_CRITERIA
+# Whether answers go to the flow for detailed feedback when the request does not say
+QA_DETAILED_DEFAULT = os.getenv('QA_DETAILED_DEFAULT', '0') == '1'
 
 
-def run_flow_qa(message: str,question,user_answer,
-  output_type: str = "chat",
-  input_type: str = "chat",) -> dict:
+def local_reference(question):
     """
-    Run a flow with a given message and optional tweaks.
+    Reference answer from the local question bank, falling back to passages from
+    the ingested reference documents. None when neither has a close match.
+    """
+    for name, get_index, lookup in (("question bank", get_question_bank, "reference_answer"),
+                                    ("reference index", get_reference_index, "reference_passages")):
+        try:
+            index = get_index()
+            reference = getattr(index, lookup)(question) if index is not None else None
+        except Exception as e:
+            print(f"Error searching the {name}: {str(e)}")
+            reference = None
+        if reference is not None:
+            return reference
+    return None
 
-    :param message: The message to send to the flow
-    :param endpoint: The ID or the endpoint name of the flow
-    :param tweaks: Optional tweaks to customize the flow
-    :return: The JSON response from the flow
+def qa_tweaks(question,user_answer,retrieved_answer=None):
     """
-    TWEAKS = {
+    Tweaks feeding the question and the user's answer into the question_answer flow.
+    A locally retrieved reference answer is passed in as retrieved_answer, with the
+    template that scores against it instead of retrieving one.
+    """
+    return {
     "TextInput-LwCyh": {
         "input_value": question
     },
     "Prompt-6YCzn": {
-        "template": "You are an AI evaluator that checks if a user's answer is correct by comparing it with a reference answer from a document.You are given the question asked to an interviewee and the answer given by the the interviewee as input.Use retrieval augmented generation(RAG) to retreive the relevant answer to the question from the document.Check the similarity between the user's response(user_answer) and the response you got from the document using RAG(retrieved_answer).\nEvaluate the user's answer for correctness, completeness, and relevance.\nProvide a similarity score from 0 to 100 and a short justification.\nYour response should be in a json format and should consist of the following fields:\njson(\n\"score\":\"\"\n\"feedback\":\"<brief explanation of why this score was given>\"\n\"missing_points\":\"<if applicable,consists of key details missing in the user's answer compared to the retrieved answer>\"\n\"suggestions\":\"\"<what improvements should the user enforce to better his/her answer>\"\n\"resources\":\"<Provide the necessary references or materials the user should consult to accurately answer the question. Make sure to provide links to every resource>\"\n\"correct_answer\":\"<a comprehensive correct answer to the question asked based on the retrieved_answer>\"\n)\n\nEvaluation Criteria:\n\n1)Factual Accuracy – Is the user's answer factually correct?\n2)Completeness – Does the user's answer cover all key points in the reference answer?\n3)Relevance – Is the response focused on answering the question?\n\nquestion = {question}\nretrieved_answer={retrieved_answer}\nuser_answer = {user_answer}",
+        "template": QA_SCORING_TEMPLATE if retrieved_answer else QA_TEMPLATE,
         "tool_placeholder": "",
         "question": "",
-        "retrieved_answer": "",
+        "retrieved_answer": retrieved_answer or "",
         "user_answer": ""
     },
     "TextInput-fS3js": {
       "input_value": user_answer
     },
   }
-    api_url = f"{BASE_API_URL}/lf/{LANGFLOW_ID}/api/v1/run/{ENDPOINT}"
-
-    payload = {
-        "input_value": message,
-        "output_type": output_type,
-        "input_type": input_type,
-    }
-    headers = None
-    if TWEAKS:
-        payload["tweaks"] = TWEAKS
-    if APPLICATION_TOKEN:
-        headers = {"Authorization": "Bearer " + APPLICATION_TOKEN, "Content-Type": "application/json"}
-    response = requests.post(api_url, json=payload, headers=headers)
-    response = response.json()
-    return response['outputs'][0]['outputs'][0]['results']['text']['text']
+
+def qa_request(question,user_answer):
+    """(endpoint, tweaks) for evaluating an answer, using the scoring flow when a local reference exists"""
+    reference = local_reference(question)
+    return SCORING_ENDPOINT if reference is not None else ENDPOINT, qa_tweaks(question, user_answer, reference)
+
+def run_flow_qa(message: str,question,user_answer,
+  output_type: str = "chat",
+  input_type: str = "chat",) -> dict:
+    """
+    Run a flow with a given message and optional tweaks.
+
+    :param message: The message to send to the flow
+    :param endpoint: The ID or the endpoint name of the flow
+    :param tweaks: Optional tweaks to customize the flow
+    :return: The JSON response from the flow
+    """
+    endpoint, tweaks = qa_request(question, user_answer)
+    return get_langflow_client().run_text(endpoint, message, tweaks, output_type, input_type)
+
+def local_evaluation(question,user_answer):
+    """Local score for a question bank question, None when the flow has to be used"""
+    try:
+        return score_answer(question, user_answer)
+    except Exception as e:
+        print(f"Error scoring answer locally: {str(e)}")
+        return None
+
+def evaluate_answer(question,user_answer,detailed=QA_DETAILED_DEFAULT,message: str = 'Execute'):
+    """
+    Evaluate one answer, locally when possible unless detailed feedback is requested
+
+    :return: JSON text in the question_answer flow's response format
+    """
+    if not detailed:
+        result = local_evaluation(question, user_answer)
+        if result is not None:
+            return result
+    return run_flow_qa(message, question, user_answer)
+
+async def evaluate_answers_async(pairs, message: str = 'Execute', max_concurrency=MAX_CONCURRENCY):
+    client = AsyncLangflowClient(max_concurrency=max_concurrency)
+    try:
+        requests = [qa_request(question, user_answer) for question, user_answer in pairs]
+        return await asyncio.gather(*(client.run_text(endpoint, message, tweaks) for endpoint, tweaks in requests),
+                                    return_exceptions=True)
+    finally:
+        client.close()
+
+def evaluate_answers(pairs, message: str = 'Execute', max_concurrency=MAX_CONCURRENCY, detailed=QA_DETAILED_DEFAULT):
+    """
+    Evaluate several (question, user_answer) pairs concurrently
+
+    :param pairs: List of (question, user_answer) tuples
+    :param detailed: Use the flow for every pair instead of local scoring where possible
+    :return: Evaluation text for each pair in input order, or the exception it failed with
+    """
+    results = [None if detailed else local_evaluation(question, user_answer) for question, user_answer in pairs]
+    remote = [index for index, result in enumerate(results) if result is None]
+    if remote:
+        remote_results = asyncio.run(evaluate_answers_async([pairs[index] for index in remote], message, max_concurrency))
+        for index, result in zip(remote, remote_results):
+            results[index] = result
+    return results
 
 # if __name__ == "__main__":
 #     res = run_flow_qa('Execute')
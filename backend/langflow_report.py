@@ -1,7 +1,8 @@
-import json
-import requests
-from dotenv import load_dotenv
 import os
+import json
+import hashlib
+from langflow_client import LangflowError, extract_text, get_langflow_client
+from report_cache import get_report_cache, report_key
 # features = '''
 # {
 #     "Audio Features": "{\"gender\": \"female\", \"pronunciation_posteriori_probability_score_percentage\": 90.09, \"number_of_syllables\": 117.0, \"rate_of_speech(syllables/second)\": 3.0, \"articulation_rate(syllables/second)\": 5.0, \"speaking_duration(seconds)\": 23.3, \"original_duration(seconds)\": 35.9, \"balance\": 0.6, \"f0_mean(Hertz)\": 196.52, \"f0_std(Hertz)\": 29.51, \"f0_median(Hertz)\": 193.5, \"f0_min(Hertz)\": 80.0, \"f0_max(Hertz)\": 384.0, \"f0_quantile25(Hertz)\": 25.0, \"f0_quantile75(Hertz)\": 179.0, \"nisqa_score\": 2.809978, \"number_of_long_pauses\": 1, \"durations_of_pauses\": [\"19.0241\"]}",
@@ -43,12 +44,26 @@ import os
 # }
 # '''
 # environment= "An online interview with a company CEO"
-load_dotenv()
-BASE_API_URL = "https://api.langflow.astra.datastax.com"
-LANGFLOW_ID = os.getenv('LANGFLOW_ID')
-FLOW_ID = os.getenv('FLOW_ID')
-APPLICATION_TOKEN = os.getenv('LANGFLOW_API_KEY')
 ENDPOINT = "report" 
+REPORT_TEMPLATE = "You are an expert and friendly communication coach who specializes in providing the right exercises which help a user overcome their weaknesses in communication,posture,enotion and grammar.\nYou are encouraging and supportive and at the same time guide the user's in the right direction to self improvement.\nYou are given a detailed analysis of the user's speech which includes audio features,posture features,emotion features and language(grammar) features which have been extracted from a video of the user talking.They include the following features:\n1. *Audio Features* - Information about pronunciation, speech rate, articulation, balance, pitch (f0 mean, median, min, max), NISQA score, and long pauses.\n2. *Posture Features* - Details about head tilt, shoulder tilt, spine angle, gesture statistics, and hand dominance.\n3. *Emotion Features* - Detection of various emotions such as neutral, happy, fear, sad, angry, and instances where no face was detected.\n4. *Language Features* - Original text, detected filler words represented by [*], corrected text, and text corrections.\nMake sure to take into complete consideration the environment the user is planning to speak in while analyzing these features and suggesting improvements.Different environment will require different pitch,posture and emotion.The environment will be given to you as input.\nYour job is to suggest *exercises to correct mistakes* wherever applicable. These exercises should be tailored to the user's weaknesses. Suggest solid exercises on your own as much as possible, include references to external sources if referring to any.It is okay to suggest other applications,books,etc as long as their appropriate references are included.They should be tailored to the user's speaking environment.\nMake sure to also provide a brief summary of the user's speech in a friendly and encouraging tone which gives the user an overview of his/her speech including both strengths and weaknesses.\nThe conclusion should be encouraging to the user towards self impovement.\nThe How to improve section should contain how the user can overcome the respective weakness.This section can be commmunicated in a strict and point-to-point manner.\n\nThe output must be structured in the following JSON format and should be directly addressing the user:\njson(\n    \"Summary\":\"\"\n    \"Strengths\": \"\"\n    \"Weaknesses\":(\n        \"Weakness\":\n        \"How to improve\":\n    )\n    \"Conclusion\":\n)\nMake sure to NOT to add special characters like \\n in any of the output, instead just the new sentence in a new line.\nEnsure that the suggestions are practical, easy to understand, and personalized. Explain how improvements in each aspect can contribute to a more engaging, confident, and effective performance.Make sure to be specific while addressing the weaknesses,let the user know the value of their weakness.Do not include any special symbols like '*' in your output.\n\nInput:\n\nEnvironment: {environment}\nDetailed Analysis: {detailed_analysis}\n"
+# The template is only sent as a tweak when it differs from the one saved in the deployed flow
+REPORT_TEMPLATE_VERSION = hashlib.sha256(REPORT_TEMPLATE.encode('utf-8')).hexdigest()[:12]
+DEPLOYED_TEMPLATE_VERSION = os.getenv('LANGFLOW_REPORT_TEMPLATE_VERSION')
+
+def report_tweaks(features,environment):
+    """Tweaks feeding the features and environment into the report flow"""
+    TWEAKS = {
+        "TextInput-7RLDX": {
+            "input_value": features
+        },
+        "Prompt-HARxq": {
+            "tool_placeholder": "",
+            "environment": environment
+        },
+    }
+    if REPORT_TEMPLATE_VERSION != DEPLOYED_TEMPLATE_VERSION:
+        TWEAKS["Prompt-HARxq"]["template"] = REPORT_TEMPLATE
+    return TWEAKS
 
 def run_flow(message: str,features,environment,
   output_type: str = "chat",
@@ -61,31 +76,76 @@ def run_flow(message: str,features,environment,
     :param tweaks: Optional tweaks to customize the flow
     :return: The JSON response from the flow
     """
-    TWEAKS = {
-        "TextInput-7RLDX": {
-            "input_value": features
-        },
-        "Prompt-HARxq": {
-            "template": "You are an expert and friendly communication coach who specializes in providing the right exercises which help a user overcome their weaknesses in communication,posture,enotion and grammar.\nYou are encouraging and supportive and at the same time guide the user's in the right direction to self improvement.\nYou are given a detailed analysis of the user's speech which includes audio features,posture features,emotion features and language(grammar) features which have been extracted from a video of the user talking.They include the following features:\n1. *Audio Features* - Information about pronunciation, speech rate, articulation, balance, pitch (f0 mean, median, min, max), NISQA score, and long pauses.\n2. *Posture Features* - Details about head tilt, shoulder tilt, spine angle, gesture statistics, and hand dominance.\n3. *Emotion Features* - Detection of various emotions such as neutral, happy, fear, sad, angry, and instances where no face was detected.\n4. *Language Features* - Original text, detected filler words represented by [*], corrected text, and text corrections.\nMake sure to take into complete consideration the environment the user is planning to speak in while analyzing these features and suggesting improvements.Different environment will require different pitch,posture and emotion.The environment will be given to you as input.\nYour job is to suggest *exercises to correct mistakes* wherever applicable. These exercises should be tailored to the user's weaknesses. Suggest solid exercises on your own as much as possible, include references to external sources if referring to any.It is okay to suggest other applications,books,etc as long as their appropriate references are included.They should be tailored to the user's speaking environment.\nMake sure to also provide a brief summary of the user's speech in a friendly and encouraging tone which gives the user an overview of his/her speech including both strengths and weaknesses.\nThe conclusion should be encouraging to the user towards self impovement.\nThe How to improve section should contain how the user can overcome the respective weakness.This section can be commmunicated in a strict and point-to-point manner.\n\nThe output must be structured in the following JSON format and should be directly addressing the user:\njson(\n    \"Summary\":\"\"\n    \"Strengths\": \"\"\n    \"Weaknesses\":(\n        \"Weakness\":\n        \"How to improve\":\n    )\n    \"Conclusion\":\n)\nMake sure to NOT to add special characters like \\n in any of the output, instead just the new sentence in a new line.\nEnsure that the suggestions are practical, easy to understand, and personalized. Explain how improvements in each aspect can contribute to a more engaging, confident, and effective performance.Make sure to be specific while addressing the weaknesses,let the user know the value of their weakness.Do not include any special symbols like '*' in your output.\n\nInput:\n\nEnvironment: {environment}\nDetailed Analysis: {detailed_analysis}\n",
-            "tool_placeholder": "",
-            "environment": environment
-        },
-    }
-    api_url = f"{BASE_API_URL}/lf/{LANGFLOW_ID}/api/v1/run/{ENDPOINT}"
+    return get_langflow_client().run_text(ENDPOINT, message, report_tweaks(features, environment), output_type, input_type)
 
-    payload = {
-        "input_value": message,
-        "output_type": output_type,
-        "input_type": input_type,
-    }
-    headers = None
-    if TWEAKS:
-        payload["tweaks"] = TWEAKS
-    if APPLICATION_TOKEN:
-        headers = {"Authorization": "Bearer " + APPLICATION_TOKEN, "Content-Type": "application/json"}
-    response = requests.post(api_url, json=payload, headers=headers)
-    response = response.json()
-    return response['outputs'][0]['outputs'][0]['results']['text']['text']
+def stream_flow(message: str,features,environment):
+    """
+    Run the report flow in streaming mode.
+
+    Yields ("token", text) for each generated piece of the report and finally
+    ("report", text) with the complete report text.
+    """
+    tokens = []
+    report = None
+    for event in get_langflow_client().stream(ENDPOINT, message, report_tweaks(features, environment)):
+        if event.get("event") == "token":
+            chunk = (event.get("data") or {}).get("chunk")
+            if chunk:
+                tokens.append(chunk)
+                yield "token", chunk
+        elif event.get("event") == "end":
+            result = (event.get("data") or {}).get("result")
+            if result:
+                report = extract_text(result)
+        elif event.get("event") == "error":
+            raise LangflowError(f"Report flow failed: {(event.get('data') or {}).get('error', event)}")
+    if report is None:
+        report = ''.join(tokens)
+    yield "report", report
+
+def stream_flow_cached(message: str,features,environment,stale_while_revalidate=None):
+    """
+    stream_flow that yields a cached report straight away and caches streamed ones
+
+    Stale reports are served and refreshed in the background like in run_flow_cached.
+    """
+    cache = get_report_cache()
+    key = report_key(features, environment, REPORT_TEMPLATE_VERSION)
+    report = cache.lookup(key, lambda: run_flow(message, features, environment), stale_while_revalidate)
+    if report is not None:
+        yield "report", report
+        return
+    for kind, text in stream_flow(message, features, environment):
+        if kind == "report":
+            cache.put(key, text)
+        yield kind, text
+
+def parse_report(report):
+    """
+    Parse the JSON structure of a generated report
+
+    The model sometimes wraps the JSON in a markdown fence or adds text around
+    it, so the outermost object is parsed. Returns None if there is none.
+    """
+    if isinstance(report, dict):
+        return report
+    start = report.find('{')
+    end = report.rfind('}')
+    if start == -1 or end < start:
+        return None
+    try:
+        return json.loads(report[start:end + 1])
+    except ValueError:
+        return None
+
+def run_flow_cached(message: str,features,environment,stale_while_revalidate=None):
+    """
+    run_flow through the report cache, keyed by the canonical features,
+    environment and prompt template version.
+    """
+    key = report_key(features, environment, REPORT_TEMPLATE_VERSION)
+    return get_report_cache().get_or_compute(key, lambda: run_flow(message, features, environment),
+                                             stale_while_revalidate)
 
 # if __name__ == "__main__":
 #     res = run_flow("Use the features provided in the input to make your analysis")
@@ -0,0 +1,192 @@
+import os
+import json
+import queue
+import threading
+import uuid
+import logging
+import cv2
+import numpy as np
+from getLivePosture import (mp_pose, landmarksToArray, getPostureMetrics, LiveSessionRecorder,
+                            MAX_HEAD_THRESHOLD, MIN_HEAD_THRESHOLD, SHOULDER_THRESHOLD, SPINE_THRESHOLD)
+from posture_overlay import buildOverlay, encodeOverlay
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of concurrent sessions running server-side pose inference
+POSE_POOL_SIZE = int(os.getenv('LIVE_POSE_POOL_SIZE', '32'))
+# Seconds a new session waits for a free pose instance before giving up
+POSE_ACQUIRE_TIMEOUT = float(os.getenv('LIVE_POSE_ACQUIRE_TIMEOUT', '2'))
+
+class PoolExhausted(Exception):
+    pass
+
+class PosePool:
+    """
+    Bounded pool of mp_pose.Pose instances.
+
+    Instances are created lazily up to max_size and handed out to one session
+    at a time, since a Pose graph keeps per-stream tracking state.
+    """
+
+    def __init__(self, max_size=POSE_POOL_SIZE, model_complexity=1):
+        self.max_size = max_size
+        self.model_complexity = model_complexity
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def _create(self):
+        return mp_pose.Pose(
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
+            model_complexity=self.model_complexity,
+            smooth_landmarks=True)
+
+    def acquire(self, timeout=POSE_ACQUIRE_TIMEOUT):
+        """Get a Pose instance, raising PoolExhausted if none frees up within timeout"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolExhausted(f"All {self.max_size} live posture sessions are in use")
+
+    def release(self, pose):
+        """Return a Pose instance to the pool with its tracking state cleared"""
+        try:
+            pose.reset()
+        except Exception as e:
+            logger.warning(f"Discarding pose instance that failed to reset: {e}")
+            pose.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(pose)
+
+    def stats(self):
+        return {"max_size": self.max_size, "created": self._created, "idle": self._idle.qsize()}
+
+class LivePostureSession:
+    """
+    One browser-sourced live posture session.
+
+    Clients send either JPEG/WebP encoded frames as binary messages, or JSON
+    messages with client-side landmarks ({"type": "landmarks", "landmarks":
+    [[x, y, ...], ...], "width": w, "height": h}). Every message gets one reply,
+    so clients should wait for it before sending the next frame. A Pose
+    instance is only taken from the pool once the first image frame arrives.
+
+    Posture replies use the overlay format from posture_overlay. Clients can
+    switch them to the compact binary encoding with {"type": "hello",
+    "format": "binary"}. Metrics of every frame with a pose are recorded, and
+    {"type": "end"} replies with the same summary analyze_video produces.
+    """
+
+    def __init__(self, pose_pool):
+        self.session_id = uuid.uuid4().hex
+        self.pose_pool = pose_pool
+        self.pose = None
+        self.frame_count = 0
+        self.overlay_format = 'json'
+        self.recorder = LiveSessionRecorder()
+
+    def handle_message(self, message):
+        """Process one client message and return the reply as a dict"""
+        if isinstance(message, (bytes, bytearray)):
+            return self.handle_frame(message)
+        try:
+            data = json.loads(message)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return {"type": "error", "error": "Messages must be binary frames or JSON"}
+        message_type = data.get("type")
+        if message_type == "landmarks":
+            return self.handle_landmarks(data)
+        if message_type == "end":
+            return {"type": "summary", "session_id": self.session_id, "summary": self.recorder.summary()}
+        if message_type == "hello":
+            if data.get("format") in ('json', 'binary'):
+                self.overlay_format = data["format"]
+            return self.describe()
+        return {"type": "error", "error": f"Unknown message type: {message_type}"}
+
+    def describe(self):
+        return {
+            "type": "session",
+            "session_id": self.session_id,
+            "format": self.overlay_format,
+            "thresholds": {
+                "max_head_tilt_degrees": MAX_HEAD_THRESHOLD,
+                "min_head_tilt_degrees": MIN_HEAD_THRESHOLD,
+                "shoulder_tilt_pixels": SHOULDER_THRESHOLD,
+                "spine_angle_degrees": SPINE_THRESHOLD
+            }
+        }
+
+    def handle_frame(self, data):
+        """Run pose inference on an encoded frame"""
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return {"type": "error", "error": "Could not decode frame"}
+        if self.pose is None:
+            self.pose = self.pose_pool.acquire()
+        
+        height, width, _ = image.shape
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        rgb_image.flags.writeable = False
+        results = self.pose.process(rgb_image)
+        
+        landmarks = landmarksToArray(results.pose_landmarks) if results.pose_landmarks else None
+        return self._reply(landmarks, width, height)
+
+    def handle_landmarks(self, data):
+        """Compute metrics from landmarks the client already detected"""
+        try:
+            landmarks = np.asarray(data["landmarks"], dtype=np.float32)
+        except (KeyError, TypeError, ValueError):
+            return {"type": "error", "error": "Invalid landmarks message"}
+        # Metrics are in pixels, normalized landmarks without the frame size would collapse to zero
+        width, height = data.get("width"), data.get("height")
+        if not all(isinstance(size, int) and not isinstance(size, bool) and size > 0 for size in (width, height)):
+            return {"type": "error", "error": "Landmarks messages need the frame width and height as positive integers"}
+        if landmarks.ndim != 2 or landmarks.shape[0] != len(mp_pose.PoseLandmark) or landmarks.shape[1] < 2:
+            return {"type": "error", "error": "Expected 33 landmarks with at least x and y"}
+        return self._reply(landmarks, width, height)
+
+    def _reply(self, landmarks, width, height):
+        self.frame_count += 1
+        metrics = None
+        if landmarks is not None:
+            metrics = getPostureMetrics(landmarks, width, height)
+            # Degenerate poses give NaN angles, which are not valid JSON and would skew the summary
+            if not np.all(np.isfinite(metrics)):
+                return {"type": "error", "error": "Could not compute posture metrics from these landmarks"}
+            self.recorder.record(landmarks, width, height, metrics=metrics)
+        return buildOverlay(self.frame_count, landmarks, width, height, metrics)
+
+    def encode(self, reply):
+        """Encode a reply for the wire, posture replies honour the negotiated overlay format"""
+        if reply.get("type") == "posture":
+            return encodeOverlay(reply, self.overlay_format)
+        return json.dumps(reply)
+
+    def close(self):
+        if self.pose is not None:
+            self.pose_pool.release(self.pose)
+            self.pose = None
@@ -0,0 +1,294 @@
+import os
+import re
+import json
+import queue
+import threading
+import uuid
+import logging
+from collections import deque
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WHISPER_SAMPLE_RATE = 16000
+LIVE_WHISPER_MODEL = os.getenv('LIVE_WHISPER_MODEL', 'tiny')
+# Sample rate of incoming PCM when the client does not say otherwise
+DEFAULT_INPUT_SAMPLE_RATE = int(os.getenv('LIVE_TRANSCRIPTION_SAMPLE_RATE', str(WHISPER_SAMPLE_RATE)))
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 192000
+
+_models_lock = threading.Lock()
+_whisper_model = None
+_gramformer = None
+# The resident models are shared by all sessions and are not safe to call concurrently
+_transcribe_lock = threading.Lock()
+
+def get_whisper_model():
+    global _whisper_model
+    with _models_lock:
+        if _whisper_model is None:
+            import torch
+            import whisper_timestamped as whisper
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            logger.info(f"Loading Whisper '{LIVE_WHISPER_MODEL}' on {device} for live transcription")
+            _whisper_model = whisper.load_model(LIVE_WHISPER_MODEL, device=device)
+        return _whisper_model
+
+def get_gramformer():
+    global _gramformer
+    with _models_lock:
+        if _gramformer is None:
+            import torch
+            from gramformer import Gramformer
+            _gramformer = Gramformer(models=1, use_gpu=torch.cuda.is_available())
+        return _gramformer
+
+class EnergyVAD:
+    """
+    Frame energy voice activity detector that cuts a PCM stream into utterances.
+
+    The noise floor is tracked with an EWMA over non-speech frames and a frame
+    is speech when its RMS is start_ratio times above it. An utterance ends
+    after end_silence_ms of silence or at max_segment_seconds, and keeps
+    pre_roll_ms of audio from before speech started so onsets are not clipped.
+    """
+
+    def __init__(self, sample_rate=WHISPER_SAMPLE_RATE, frame_ms=30, start_ratio=3.0, min_rms=0.01,
+                 min_speech_ms=250, end_silence_ms=600, max_segment_seconds=15, pre_roll_ms=300,
+                 noise_alpha=0.05):
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.start_ratio = start_ratio
+        self.min_rms = min_rms
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.end_silence_frames = max(1, end_silence_ms // frame_ms)
+        self.max_segment_frames = int(max_segment_seconds * 1000 / frame_ms)
+        self.noise_alpha = noise_alpha
+        self.noise_floor = None
+        self._pending = np.empty(0, dtype=np.float32)
+        self._pre_roll = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self._frame_index = 0
+        self._segment = None
+        self._segment_start = 0
+        self._voiced = 0
+        self._silence = 0
+
+    def _is_speech(self, rms):
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        threshold = max(self.min_rms, self.noise_floor * self.start_ratio)
+        if rms <= threshold and self._segment is None:
+            self.noise_floor += self.noise_alpha * (rms - self.noise_floor)
+        return rms > threshold
+
+    def _finish(self):
+        segment, start = self._segment, self._segment_start
+        voiced = self._voiced
+        self._segment = None
+        self._voiced = self._silence = 0
+        if voiced < self.min_speech_frames:
+            return None
+        return start / self.sample_rate, np.concatenate(segment)
+
+    def feed(self, samples):
+        """
+        Add float32 samples
+
+        Returns:
+            List of finished (start_seconds, samples) utterances
+        """
+        finished = []
+        samples = np.concatenate([self._pending, np.asarray(samples, dtype=np.float32)])
+        count = len(samples) // self.frame_size
+        self._pending = samples[count * self.frame_size:]
+        if not count:
+            return finished
+        frames = samples[:count * self.frame_size].reshape(count, self.frame_size)
+        for frame, rms in zip(frames, np.sqrt(np.mean(frames ** 2, axis=1))):
+            speech = self._is_speech(rms)
+            if self._segment is None:
+                if speech:
+                    self._segment = list(self._pre_roll) + [frame]
+                    self._segment_start = (self._frame_index - len(self._pre_roll)) * self.frame_size
+                    self._pre_roll.clear()
+                    self._voiced = 1
+                else:
+                    self._pre_roll.append(frame)
+            else:
+                self._segment.append(frame)
+                if speech:
+                    self._voiced += 1
+                    self._silence = 0
+                else:
+                    self._silence += 1
+                if self._silence >= self.end_silence_frames or len(self._segment) >= self.max_segment_frames:
+                    result = self._finish()
+                    if result is not None:
+                        finished.append(result)
+            self._frame_index += 1
+        return finished
+
+    def flush(self):
+        """Finish any utterance in progress at the end of the stream"""
+        if self._segment is None:
+            return []
+        result = self._finish()
+        return [result] if result is not None else []
+
+def resample(samples, source_rate, target_rate=WHISPER_SAMPLE_RATE):
+    if source_rate == target_rate or not len(samples):
+        return samples
+    duration = len(samples) / source_rate
+    target = np.arange(int(duration * target_rate)) / target_rate
+    return np.interp(target, np.arange(len(samples)) / source_rate, samples).astype(np.float32)
+
+def analyze_segment(samples, start):
+    """
+    Transcribe one utterance and check it for fillers and grammar
+
+    Args:
+        samples: 16 kHz float32 audio of the utterance
+        start: Offset of the utterance in the stream, added to word timestamps
+    """
+    import whisper_timestamped as whisper
+    from filler_words import find_fillers
+    model = get_whisper_model()
+    gf = get_gramformer()
+    with _transcribe_lock:
+        result = whisper.transcribe(model, samples, language='en', detect_disfluencies=True)
+        words = []
+        for segment in result["segments"]:
+            for word in segment.get("words", []):
+                words.append(dict(word, start=round(word["start"] + start, 2), end=round(word["end"] + start, 2)))
+        text = result["text"].strip()
+        corrections = []
+        highlights = []
+        for sentence in re.split(r'(?<=[.!?])\s+', text):
+            if not sentence:
+                continue
+            for corrected_sentence in gf.correct(sentence, max_candidates=1):
+                corrections.append({'original': sentence, 'corrected': corrected_sentence})
+                highlights.append(gf.highlight(sentence, corrected_sentence))
+    return {
+        "start": round(start, 2),
+        "end": round(start + len(samples) / WHISPER_SAMPLE_RATE, 2),
+        "text": text,
+        "filler_words": find_fillers(words, language='en'),
+        "corrections": corrections,
+        "highlights": highlights
+    }
+
+_END = object()
+
+class LiveTranscriptionSession:
+    """
+    State of one /ws/live_transcription connection.
+
+    Binary messages are mono 16-bit little-endian PCM at the session sample
+    rate. A JSON {"type": "hello", "sample_rate": ...} message sets the rate and
+    {"type": "end"} flushes the last utterance and requests the summary.
+    Utterances cut by the VAD are analyzed on a worker thread and their results
+    are collected with poll(), so audio keeps being received meanwhile.
+    """
+
+    def __init__(self, sample_rate=DEFAULT_INPUT_SAMPLE_RATE):
+        self.session_id = uuid.uuid4().hex[:8]
+        self.sample_rate = sample_rate
+        self.vad = EnergyVAD(sample_rate)
+        self.segments = []
+        self.samples_received = 0
+        self.done = False
+        self._odd_byte = b''
+        self._pending = queue.Queue()
+        self._results = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True, name=f"transcribe-{self.session_id}")
+        self._worker.start()
+
+    def describe(self):
+        return {"type": "ready", "session_id": self.session_id, "sample_rate": self.sample_rate}
+
+    def _run(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            if item is _END:
+                self._results.put(self.summary())
+                return
+            start, samples = item
+            try:
+                segment = analyze_segment(resample(samples, self.sample_rate), start)
+            except Exception as e:
+                logger.error(f"Live transcription session {self.session_id} failed on a segment: {e}")
+                self._results.put({"type": "error", "error": str(e)})
+                continue
+            segment["index"] = len(self.segments)
+            self.segments.append(segment)
+            self._results.put(dict(segment, type="segment"))
+
+    def handle_message(self, message):
+        """Process one client message, returns replies to send right away"""
+        if isinstance(message, (bytes, bytearray)):
+            # Frames need not end on a sample boundary, an odd trailing byte goes with the next frame
+            message = self._odd_byte + bytes(message)
+            split = len(message) - len(message) % 2
+            self._odd_byte = message[split:]
+            samples = np.frombuffer(message[:split], dtype='<i2').astype(np.float32) / 32768.0
+            self.samples_received += len(samples)
+            replies = []
+            for utterance in self.vad.feed(samples):
+                self._pending.put(utterance)
+                replies.append({"type": "utterance", "start": round(utterance[0], 2)})
+            return replies
+        try:
+            data = json.loads(message)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return [{"type": "error", "error": "Expected PCM audio or a JSON message"}]
+        kind = data.get("type")
+        if kind == "hello":
+            if not self.samples_received:
+                sample_rate = data.get("sample_rate", self.sample_rate)
+                if isinstance(sample_rate, bool) or not isinstance(sample_rate, int) or \
+                        not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+                    return [{"type": "error",
+                             "error": f"sample_rate must be an integer between {MIN_SAMPLE_RATE} and {MAX_SAMPLE_RATE}"}]
+                self.sample_rate = sample_rate
+                self.vad = EnergyVAD(self.sample_rate)
+            return [self.describe()]
+        if kind == "end":
+            for utterance in self.vad.flush():
+                self._pending.put(utterance)
+            self._pending.put(_END)
+            return []
+        return [{"type": "error", "error": f"Unknown message type {kind}"}]
+
+    def poll(self):
+        """Results finished since the last call"""
+        results = []
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                return results
+            if result.get("type") == "summary":
+                self.done = True
+            results.append(result)
+
+    def summary(self):
+        """The whole drill in the shape returned by getLangTrain"""
+        filler_words = [word for segment in self.segments for word in segment["filler_words"]]
+        return {
+            "type": "summary",
+            "original_text": " ".join(segment["text"] for segment in self.segments if segment["text"]),
+            "filler_words": {
+                "count": len(filler_words),
+                "wordlist": filler_words
+            },
+            "corrections": [correction for segment in self.segments for correction in segment["corrections"]],
+            "highlight_list": [highlight for segment in self.segments for highlight in segment["highlights"]]
+        }
+
+    def close(self):
+        self._pending.put(None)
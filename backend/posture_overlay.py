@@ -0,0 +1,102 @@
+import json
+import struct
+import numpy as np
+from getLivePosture import getPostureMetrics, getThresholdStates
+
+# Binary overlay message layout (little endian):
+#   magic b'PO', version (uint8), flags (uint8), frame (uint32),
+#   head_tilt, shoulder_tilt, spine_angle (float32),
+#   then 33 landmarks of x, y (uint16, normalized * 65535) and visibility (uint8, * 255)
+OVERLAY_MAGIC = b'PO'
+OVERLAY_VERSION = 1
+NUM_LANDMARKS = 33
+HEADER = struct.Struct('<2sBBI3f')
+LANDMARK_DTYPE = np.dtype([('x', '<u2'), ('y', '<u2'), ('visibility', 'u1')])
+
+FLAG_POSE_DETECTED = 1
+FLAG_HEAD_TILT_OK = 2
+FLAG_SHOULDER_TILT_OK = 4
+FLAG_SPINE_ANGLE_OK = 8
+
+def buildOverlay(frame, landmarks, width, height, metrics=None):
+    """
+    Build the overlay message for one frame
+
+    Args:
+        frame: Frame sequence number
+        landmarks: (33, 4) array of normalized x, y, z, visibility, or None if no pose was detected
+        width: Frame width in pixels
+        height: Frame height in pixels
+        metrics: Precomputed (head_tilt, shoulder_tilt, spine_angle), computed from landmarks if None
+
+    Returns:
+        Dictionary with landmarks, posture metrics and threshold states
+    """
+    overlay = {"type": "posture", "frame": frame, "pose_detected": landmarks is not None}
+    if landmarks is None:
+        return overlay
+    head_tilt, shoulder_tilt, spine_angle = metrics or getPostureMetrics(landmarks, width, height)
+    overlay["metrics"] = {
+        "head_tilt": round(head_tilt, 1),
+        "shoulder_tilt": round(shoulder_tilt, 1),
+        "spine_angle": round(spine_angle, 1)
+    }
+    overlay["status"] = getThresholdStates(head_tilt, shoulder_tilt, spine_angle)
+    # Normalized x, y and visibility for the client to draw
+    columns = landmarks[:, [0, 1, 3]] if landmarks.shape[1] >= 4 else landmarks[:, :2]
+    overlay["landmarks"] = np.round(columns, 4).tolist()
+    return overlay
+
+def encodeOverlayJSON(overlay):
+    return json.dumps(overlay, separators=(',', ':'))
+
+def encodeOverlayBinary(overlay):
+    """Pack an overlay message into a fixed-size binary message (185 bytes with a pose, 20 without)"""
+    flags = 0
+    metrics = (0.0, 0.0, 0.0)
+    if overlay["pose_detected"]:
+        flags |= FLAG_POSE_DETECTED
+        status = overlay["status"]
+        flags |= FLAG_HEAD_TILT_OK if status["head_tilt_ok"] else 0
+        flags |= FLAG_SHOULDER_TILT_OK if status["shoulder_tilt_ok"] else 0
+        flags |= FLAG_SPINE_ANGLE_OK if status["spine_angle_ok"] else 0
+        metrics = (overlay["metrics"]["head_tilt"], overlay["metrics"]["shoulder_tilt"], overlay["metrics"]["spine_angle"])
+    header = HEADER.pack(OVERLAY_MAGIC, OVERLAY_VERSION, flags, overlay["frame"] & 0xFFFFFFFF, *metrics)
+    if not overlay["pose_detected"]:
+        return header
+    
+    landmarks = np.asarray(overlay["landmarks"], dtype=np.float32)
+    packed = np.zeros(NUM_LANDMARKS, dtype=LANDMARK_DTYPE)
+    packed['x'] = np.round(np.clip(landmarks[:, 0], 0, 1) * 65535)
+    packed['y'] = np.round(np.clip(landmarks[:, 1], 0, 1) * 65535)
+    if landmarks.shape[1] >= 3:
+        packed['visibility'] = np.round(np.clip(landmarks[:, 2], 0, 1) * 255)
+    return header + packed.tobytes()
+
+def decodeOverlayBinary(data):
+    """Unpack a binary overlay message back into the dictionary form"""
+    magic, version, flags, frame, head_tilt, shoulder_tilt, spine_angle = HEADER.unpack_from(data)
+    if magic != OVERLAY_MAGIC or version != OVERLAY_VERSION:
+        raise ValueError("Not a posture overlay message")
+    overlay = {"type": "posture", "frame": frame, "pose_detected": bool(flags & FLAG_POSE_DETECTED)}
+    if not overlay["pose_detected"]:
+        return overlay
+    overlay["metrics"] = {"head_tilt": head_tilt, "shoulder_tilt": shoulder_tilt, "spine_angle": spine_angle}
+    overlay["status"] = {
+        "head_tilt_ok": bool(flags & FLAG_HEAD_TILT_OK),
+        "shoulder_tilt_ok": bool(flags & FLAG_SHOULDER_TILT_OK),
+        "spine_angle_ok": bool(flags & FLAG_SPINE_ANGLE_OK)
+    }
+    packed = np.frombuffer(data, dtype=LANDMARK_DTYPE, count=NUM_LANDMARKS, offset=HEADER.size)
+    overlay["landmarks"] = np.stack([packed['x'] / 65535, packed['y'] / 65535, packed['visibility'] / 255], axis=1).tolist()
+    return overlay
+
+def encodeOverlay(overlay, fmt='json'):
+    """Encode an overlay message as 'json' (str) or 'binary' (bytes)"""
+    if fmt == 'binary':
+        return encodeOverlayBinary(overlay)
+    return encodeOverlayJSON(overlay)
+
+def encodeOverlayFormats(overlay):
+    """Encode an overlay message once in every format, for broadcasting to clients that asked for different ones"""
+    return {'json': encodeOverlayJSON(overlay), 'binary': encodeOverlayBinary(overlay)}
@@ -0,0 +1,180 @@
+import os
+import json
+import argparse
+import threading
+from collections import OrderedDict
+import numpy as np
+
+QA_EMBEDDING_MODEL = os.getenv('QA_EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+QA_INDEX_DIR = os.getenv('QA_INDEX_DIR', os.path.join(os.getcwd(), 'qa_index'))
+# Minimum cosine similarity for a bank question to count as the asked question
+QA_MATCH_THRESHOLD = float(os.getenv('QA_MATCH_THRESHOLD', '0.8'))
+EMBEDDING_CACHE_SIZE = int(os.getenv('QA_EMBEDDING_CACHE_SIZE', '4096'))
+
+class Embedder:
+    """
+    Sentence embedder over a transformers encoder with mean pooling.
+
+    The model is loaded on first use, vectors are L2 normalized so dot products
+    are cosine similarities, and recent texts are kept in an LRU cache.
+    """
+
+    def __init__(self, model_name=QA_EMBEDDING_MODEL, cache_size=EMBEDDING_CACHE_SIZE, batch_size=64):
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._model = None
+        self._tokenizer = None
+        self._device = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+        self._device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self._model = AutoModel.from_pretrained(self.model_name).to(self._device).eval()
+
+    def _encode(self, texts):
+        import torch
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = self._tokenizer(texts[start:start + self.batch_size], padding=True, truncation=True,
+                                    max_length=256, return_tensors='pt').to(self._device)
+            with torch.no_grad():
+                hidden = self._model(**batch).last_hidden_state
+            mask = batch['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            vectors.append(torch.nn.functional.normalize(pooled, dim=1).cpu().numpy().astype(np.float32))
+        return np.concatenate(vectors)
+
+    def encode(self, texts):
+        """Embed a list of texts into an (n, dim) float32 matrix of unit vectors"""
+        texts = [text.strip() for text in texts]
+        with self._lock:
+            if self._model is None:
+                self._load()
+            missing = list(OrderedDict.fromkeys(text for text in texts if text not in self._cache))
+            if missing:
+                for text, vector in zip(missing, self._encode(missing)):
+                    self._cache[text] = vector
+            for text in texts:
+                self._cache.move_to_end(text)
+            vectors = np.stack([self._cache[text] for text in texts])
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vectors
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def get_embedder():
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            _embedder = Embedder()
+        return _embedder
+
+def top_k(matrix, query, k):
+    """
+    Brute-force top-k by dot product
+
+    Returns:
+        (indices, scores) sorted by descending score
+    """
+    if len(matrix) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    scores = matrix @ query
+    k = min(k, len(scores))
+    indices = np.argpartition(-scores, k - 1)[:k]
+    indices = indices[np.argsort(-scores[indices])]
+    return indices, scores[indices]
+
+class QuestionBank:
+    """
+    Company question bank with precomputed question embeddings.
+
+    The embeddings live in embeddings.f32, an (n, dim) float32 matrix that is
+    memory-mapped read-only, next to entries.json holding the questions and
+    reference answers in the same row order.
+    """
+
+    def __init__(self, directory=QA_INDEX_DIR, embedder=None):
+        self.directory = directory
+        self.embedder = embedder or get_embedder()
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        with open(os.path.join(directory, 'entries.json'), encoding='utf-8') as f:
+            self.entries = json.load(f)
+        if self.meta['count']:
+            self.matrix = np.memmap(os.path.join(directory, 'embeddings.f32'), dtype=np.float32, mode='r',
+                                    shape=(self.meta['count'], self.meta['dim']))
+        else:
+            self.matrix = np.empty((0, self.meta['dim']), dtype=np.float32)
+
+    @staticmethod
+    def build(entries, directory=QA_INDEX_DIR, embedder=None):
+        """
+        Embed and write a question bank
+
+        Args:
+            entries: List of dicts with at least "question" and "answer"
+            directory: Output directory, replaced atomically file by file
+        """
+        embedder = embedder or get_embedder()
+        os.makedirs(directory, exist_ok=True)
+        matrix = embedder.encode([entry['question'] for entry in entries]) if entries else np.empty((0, 0), np.float32)
+        path = os.path.join(directory, 'embeddings.f32')
+        matrix.astype(np.float32).tofile(path + '.tmp')
+        os.replace(path + '.tmp', path)
+        for name, data in (('entries.json', entries),
+                           ('meta.json', {'model': embedder.model_name, 'count': len(entries), 'dim': matrix.shape[1]})):
+            path = os.path.join(directory, name)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(path + '.tmp', path)
+        return QuestionBank(directory, embedder)
+
+    def search(self, question, k=5):
+        """Closest bank entries to question as a list of (score, entry)"""
+        query = self.embedder.encode([question])[0]
+        indices, scores = top_k(self.matrix, query, k)
+        return [(float(score), self.entries[index]) for index, score in zip(indices, scores)]
+
+    def reference_answer(self, question, threshold=QA_MATCH_THRESHOLD):
+        """Reference answer of the best matching bank question, None below threshold"""
+        matches = self.search(question, k=1)
+        if not matches or matches[0][0] < threshold:
+            return None
+        return matches[0][1]['answer']
+
+_question_bank = None
+_question_bank_lock = threading.Lock()
+
+def get_question_bank():
+    """Question bank loaded from QA_INDEX_DIR, None when no bank has been built"""
+    global _question_bank
+    with _question_bank_lock:
+        if _question_bank is None and os.path.exists(os.path.join(QA_INDEX_DIR, 'meta.json')):
+            _question_bank = QuestionBank(QA_INDEX_DIR)
+        return _question_bank
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or query the local QA question bank")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help="Embed a JSON list of {question, answer} entries")
+    build_parser.add_argument('entries')
+    search_parser = subparsers.add_parser('search', help="Show the closest bank questions")
+    search_parser.add_argument('question')
+    search_parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--index-dir', default=QA_INDEX_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        with open(args.entries, encoding='utf-8') as f:
+            bank = QuestionBank.build(json.load(f), args.index_dir)
+        print(f"Indexed {bank.meta['count']} questions into {args.index_dir}")
+    else:
+        for score, entry in QuestionBank(args.index_dir).search(args.question, args.k):
+            print(f"{score:.3f}  {entry['question']}")
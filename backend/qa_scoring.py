@@ -0,0 +1,114 @@
+import re
+import math
+import json
+import numpy as np
+from qa_index import get_embedder, get_question_bank
+
+# Cosine similarity at which a reference sentence counts as fully covered
+SEMANTIC_FULL_CREDIT = 0.75
+# Similarity below which a sentence gets no semantic credit
+SEMANTIC_NO_CREDIT = 0.35
+# Key points covered below this fraction are reported as missing
+MISSING_POINT_THRESHOLD = 0.5
+SEMANTIC_WEIGHT = 0.7
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset(
+    "a an the and or but if then than so of to in on at by for with from into over under about as is are was "
+    "were be been being it its this that these those there here which who whom what when where why how i you "
+    "he she we they me him her us them my your our their do does did done can could should would will shall "
+    "may might must not no yes also very just more most such any all each other some only own same too".split())
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in re.split(r'(?<=[.!?;])\s+|\n+', text or '') if sentence.strip()]
+
+def tokenize(text):
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+def bm25_coverage(points, answer_tokens):
+    """
+    How much of each reference point's vocabulary the answer covers
+
+    Each point is scored as a BM25 document against the answer's terms as the
+    query, normalized by the score of the point's own terms so the result is
+    between 0 and 1.
+    """
+    documents = [tokenize(point) for point in points]
+    if not documents:
+        return []
+    average_length = sum(len(document) for document in documents) / len(documents) or 1
+    document_frequency = {}
+    for document in documents:
+        for term in set(document):
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+    answer_terms = set(answer_tokens)
+    coverage = []
+    for document in documents:
+        counts = {}
+        for term in document:
+            counts[term] = counts.get(term, 0) + 1
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(document) / average_length)
+        total = covered = 0.0
+        for term, count in counts.items():
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            weight = idf * count * (BM25_K1 + 1) / (count + norm)
+            total += weight
+            if term in answer_terms:
+                covered += weight
+        coverage.append(covered / total if total else 0.0)
+    return coverage
+
+def semantic_coverage(points, answer_sentences, embedder):
+    """Best cosine similarity of each reference point against the answer sentences, mapped to 0..1"""
+    if not points or not answer_sentences:
+        return [0.0] * len(points)
+    vectors = embedder.encode(points + answer_sentences)
+    similarity = (vectors[:len(points)] @ vectors[len(points):].T).max(axis=1)
+    credit = (similarity - SEMANTIC_NO_CREDIT) / (SEMANTIC_FULL_CREDIT - SEMANTIC_NO_CREDIT)
+    return np.clip(credit, 0.0, 1.0).tolist()
+
+def score_against_reference(user_answer, reference, embedder=None):
+    """
+    Score an answer against a reference answer without the LLM
+
+    Returns:
+        Dict with score (0-100), per point coverage and missing_points
+    """
+    embedder = embedder or get_embedder()
+    points = split_sentences(reference)
+    semantic = semantic_coverage(points, split_sentences(user_answer), embedder)
+    keyword = bm25_coverage(points, tokenize(user_answer or ''))
+    coverage = [SEMANTIC_WEIGHT * s + (1 - SEMANTIC_WEIGHT) * k for s, k in zip(semantic, keyword)]
+    # Longer points carry more of the answer's content
+    weights = [max(1, len(tokenize(point))) for point in points]
+    score = sum(c * w for c, w in zip(coverage, weights)) / sum(weights) if points else 0.0
+    return {
+        "score": int(round(score * 100)),
+        "coverage": [round(value, 2) for value in coverage],
+        "missing_points": [point for point, value in zip(points, coverage) if value < MISSING_POINT_THRESHOLD]
+    }
+
+def score_answer(question, user_answer):
+    """
+    Fast local evaluation of an answer to a question bank question
+
+    Returns:
+        JSON string with the fields of the question_answer flow's response, or
+        None if the question is not in the local bank
+    """
+    bank = get_question_bank()
+    reference = bank.reference_answer(question) if bank is not None else None
+    if reference is None:
+        return None
+    result = score_against_reference(user_answer, reference, bank.embedder)
+    missing = result["missing_points"]
+    return json.dumps({
+        "score": str(result["score"]),
+        "feedback": f"Your answer covers {len(result['coverage']) - len(missing)} of the {len(result['coverage'])} key points of the reference answer.",
+        "missing_points": " ".join(missing),
+        "suggestions": "Request detailed feedback for suggestions on improving this answer." if missing else "",
+        "resources": "",
+        "correct_answer": reference,
+        "mode": "local"
+    })
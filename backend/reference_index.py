@@ -0,0 +1,379 @@
+import os
+import math
+import json
+import sqlite3
+import hashlib
+import argparse
+import threading
+import numpy as np
+from qa_index import get_embedder, top_k
+from qa_scoring import split_sentences, tokenize
+
+REFERENCE_INDEX_DIR = os.getenv('REFERENCE_INDEX_DIR', os.path.join(os.getcwd(), 'reference_index'))
+# Minimum cosine similarity for a chunk to be used as reference material
+REFERENCE_MATCH_THRESHOLD = float(os.getenv('REFERENCE_MATCH_THRESHOLD', '0.5'))
+CHUNK_WORDS = 120
+CHUNK_OVERLAP_WORDS = 20
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Query terms this common add almost nothing to BM25 but have the longest postings, so they are skipped
+MIN_TERM_IDF = 0.05
+# Postings kept in memory across queries, as a total number of (chunk, tf) entries
+POSTINGS_CACHE_ENTRIES = 4_000_000
+# Rank constant of reciprocal rank fusion between the keyword and embedding rankings
+RRF_K = 60
+DOCUMENT_EXTENSIONS = ('.txt', '.md')
+
+def chunk_text(text, max_words=CHUNK_WORDS, overlap_words=CHUNK_OVERLAP_WORDS):
+    """Split text into chunks of whole sentences, each new chunk repeating up to overlap_words of the last"""
+    chunks = []
+    current = []
+    current_words = 0
+    for sentence in split_sentences(text):
+        words = len(sentence.split())
+        if current and current_words + words > max_words:
+            chunks.append(' '.join(current))
+            overlap = []
+            overlap_count = 0
+            for previous in reversed(current):
+                overlap_count += len(previous.split())
+                if overlap_count > overlap_words:
+                    break
+                overlap.insert(0, previous)
+            current = overlap
+            current_words = sum(len(previous.split()) for previous in current)
+        current.append(sentence)
+        current_words += words
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+class ReferenceIndex:
+    """
+    Persistent hybrid index over chunked company reference documents.
+
+    index.sqlite3 holds the documents, their chunks, a term -> chunk postings
+    table and per-term document frequencies used for BM25. embeddings.f32 is a float32 matrix with one
+    row per chunk, rows of removed chunks are recycled by later additions so
+    documents can be added and removed without rebuilding either structure.
+    """
+
+    def __init__(self, directory=REFERENCE_INDEX_DIR, embedder=None):
+        self.directory = directory
+        self.embedder = embedder or get_embedder()
+        os.makedirs(directory, exist_ok=True)
+        self.matrix_path = os.path.join(directory, 'embeddings.f32')
+        self._lock = threading.RLock()
+        self._matrix = None
+        self._row_chunks = None
+        self._lengths = None
+        self._postings = {}
+        self._postings_entries = 0
+        self._conn = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS documents (doc_id TEXT PRIMARY KEY, digest TEXT NOT NULL, chunks INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id INTEGER PRIMARY KEY, doc_id TEXT NOT NULL, row INTEGER NOT NULL UNIQUE,
+                length INTEGER NOT NULL, text TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL, chunk_id INTEGER NOT NULL, tf INTEGER NOT NULL,
+                PRIMARY KEY (term, chunk_id)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_chunk_id ON postings (chunk_id);
+            CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY);
+        """)
+
+    def _meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    @property
+    def dim(self):
+        return self._meta('dim')
+
+    def _matrix_rows(self):
+        if not self.dim or not os.path.exists(self.matrix_path):
+            return 0
+        return os.path.getsize(self.matrix_path) // (4 * self.dim)
+
+    def _allocate_rows(self, count):
+        """Recycled rows of removed chunks first, then new rows at the end of the matrix"""
+        rows = [row for row, in self._conn.execute("SELECT row FROM free_rows ORDER BY row LIMIT ?", (count,))]
+        self._conn.executemany("DELETE FROM free_rows WHERE row = ?", [(row,) for row in rows])
+        end = self._matrix_rows()
+        return rows + list(range(end, end + count - len(rows)))
+
+    def _write_rows(self, rows, vectors):
+        end = self._matrix_rows()
+        recycled = [(row, vector) for row, vector in zip(rows, vectors) if row < end]
+        if recycled:
+            matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='r+', shape=(end, self.dim))
+            for row, vector in recycled:
+                matrix[row] = vector
+            matrix.flush()
+            del matrix
+        appended = [vector for row, vector in zip(rows, vectors) if row >= end]
+        if appended:
+            with open(self.matrix_path, 'ab') as f:
+                np.asarray(appended, dtype=np.float32).tofile(f)
+
+    def _update_document_frequencies(self, term_counts, sign):
+        self._conn.executemany("INSERT INTO terms (term, df) VALUES (?, ?) "
+                               "ON CONFLICT (term) DO UPDATE SET df = df + excluded.df",
+                               [(term, sign * count) for term, count in term_counts])
+        if sign < 0:
+            self._conn.execute("DELETE FROM terms WHERE df <= 0")
+
+    def _remove(self, doc_id):
+        chunks = self._conn.execute("SELECT chunk_id, row FROM chunks WHERE doc_id = ?", (doc_id,)).fetchall()
+        self._update_document_frequencies(self._conn.execute(
+            "SELECT p.term, COUNT(*) FROM postings p JOIN chunks c ON c.chunk_id = p.chunk_id "
+            "WHERE c.doc_id = ? GROUP BY p.term", (doc_id,)).fetchall(), -1)
+        self._conn.executemany("DELETE FROM postings WHERE chunk_id = ?", [(chunk_id,) for chunk_id, _ in chunks])
+        self._conn.executemany("INSERT OR IGNORE INTO free_rows (row) VALUES (?)", [(row,) for _, row in chunks])
+        self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+        self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        return len(chunks)
+
+    def add_documents(self, documents, batch_size=256):
+        """
+        Add or replace documents
+
+        Args:
+            documents: Iterable of (doc_id, text), unchanged documents are skipped
+
+        Returns:
+            Number of documents (re)indexed
+        """
+        indexed = 0
+        with self._lock:
+            pending = []
+            for doc_id, text in documents:
+                digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+                row = self._conn.execute("SELECT digest FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+                if row and row[0] == digest:
+                    continue
+                pending.append((doc_id, digest, chunk_text(text)))
+                if sum(len(chunks) for _, _, chunks in pending) >= batch_size:
+                    indexed += self._index(pending)
+                    pending = []
+            if pending:
+                indexed += self._index(pending)
+        return indexed
+
+    def _index(self, pending):
+        texts = [chunk for _, _, chunks in pending for chunk in chunks]
+        vectors = self.embedder.encode(texts) if texts else np.empty((0, self.dim or 0), np.float32)
+        matrix_size = os.path.getsize(self.matrix_path) if os.path.exists(self.matrix_path) else 0
+        try:
+            self._index_rows(pending, texts, vectors)
+        except BaseException:
+            # The transaction was rolled back, drop rows appended for it so the matrix matches the database.
+            # Recycled rows that were overwritten were already free before it, so no chunk reads them.
+            if os.path.exists(self.matrix_path) and os.path.getsize(self.matrix_path) > matrix_size:
+                os.truncate(self.matrix_path, matrix_size)
+            raise
+        self._invalidate()
+        return len(pending)
+
+    def _index_rows(self, pending, texts, vectors):
+        with self._conn:
+            if texts and self.dim is None:
+                self._set_meta('dim', int(vectors.shape[1]))
+                self._set_meta('model', getattr(self.embedder, 'model_name', None))
+            # Allocated before the replaced documents are removed, so their rows are not reused and
+            # overwritten in this transaction; a rollback restores those chunks with their vectors intact
+            rows = self._allocate_rows(len(texts))
+            for doc_id, _, _ in pending:
+                self._remove(doc_id)
+            position = 0
+            document_frequency = {}
+            postings = []
+            for doc_id, digest, chunks in pending:
+                self._conn.execute("INSERT INTO documents (doc_id, digest, chunks) VALUES (?, ?, ?)",
+                                   (doc_id, digest, len(chunks)))
+                for chunk in chunks:
+                    tokens = tokenize(chunk)
+                    cursor = self._conn.execute("INSERT INTO chunks (doc_id, row, length, text) VALUES (?, ?, ?, ?)",
+                                                (doc_id, rows[position], len(tokens), chunk))
+                    counts = {}
+                    for token in tokens:
+                        counts[token] = counts.get(token, 0) + 1
+                    for term, tf in counts.items():
+                        postings.append((term, cursor.lastrowid, tf))
+                        document_frequency[term] = document_frequency.get(term, 0) + 1
+                    position += 1
+            # Inserting in key order keeps the postings B-tree writes sequential
+            postings.sort()
+            self._conn.executemany("INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", postings)
+            self._update_document_frequencies(document_frequency.items(), 1)
+            self._write_rows(rows, vectors)
+
+    def _invalidate(self):
+        self._matrix = self._lengths = None
+        self._postings = {}
+        self._postings_entries = 0
+
+    def remove_documents(self, doc_ids):
+        """Remove documents, returns the number of chunks removed"""
+        with self._lock, self._conn:
+            removed = sum(self._remove(doc_id) for doc_id in doc_ids)
+            self._invalidate()
+        return removed
+
+    def documents(self):
+        with self._lock:
+            return self._conn.execute("SELECT doc_id, chunks FROM documents ORDER BY doc_id").fetchall()
+
+    def _load_matrix(self):
+        if self._matrix is None:
+            rows = self._matrix_rows()
+            row_chunks = np.full(rows, -1, dtype=np.int64)
+            for chunk_id, row in self._conn.execute("SELECT chunk_id, row FROM chunks"):
+                row_chunks[row] = chunk_id
+            matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='r', shape=(rows, self.dim)) if rows else \
+                np.empty((0, self.dim or 0), np.float32)
+            self._matrix, self._row_chunks = matrix, row_chunks
+        return self._matrix, self._row_chunks
+
+    def _chunk_lengths(self):
+        if self._lengths is None:
+            rows = self._conn.execute("SELECT chunk_id, length FROM chunks").fetchall()
+            lengths = np.zeros(max((chunk_id for chunk_id, _ in rows), default=-1) + 1, dtype=np.float64)
+            for chunk_id, length in rows:
+                lengths[chunk_id] = length
+            self._lengths = (lengths, len(rows), sum(length for _, length in rows))
+        return self._lengths
+
+    def _term_postings(self, term):
+        """(chunk_ids, tf) arrays of a term, cached until the index changes"""
+        postings = self._postings.get(term)
+        if postings is None:
+            rows = np.asarray(self._conn.execute("SELECT chunk_id, tf FROM postings WHERE term = ?", (term,)).fetchall(),
+                              dtype=np.int64).reshape(-1, 2)
+            postings = (rows[:, 0], rows[:, 1].astype(np.float64))
+            if self._postings_entries + len(rows) > POSTINGS_CACHE_ENTRIES:
+                self._postings = {}
+                self._postings_entries = 0
+            self._postings[term] = postings
+            self._postings_entries += len(rows)
+        return postings
+
+    def keyword_search(self, query, k):
+        """BM25 ranking of chunks as a list of (chunk_id, score)"""
+        with self._lock:
+            lengths, count, total_length = self._chunk_lengths()
+            terms = set(tokenize(query))
+            if not terms or not count:
+                return []
+            average_length = total_length / count
+            scores = np.zeros(len(lengths), dtype=np.float64)
+            placeholders = ','.join('?' * len(terms))
+            for term, df in self._conn.execute(f"SELECT term, df FROM terms WHERE term IN ({placeholders})",
+                                               list(terms)).fetchall():
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                if idf < MIN_TERM_IDF:
+                    continue
+                chunk_ids, tf = self._term_postings(term)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[chunk_ids] / average_length)
+                scores[chunk_ids] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            k = min(k, len(scores))
+            indices = np.argpartition(-scores, k - 1)[:k]
+            indices = indices[np.argsort(-scores[indices])]
+            return [(int(chunk_id), float(scores[chunk_id])) for chunk_id in indices if scores[chunk_id] > 0]
+
+    def search(self, query, k=5, candidates=50):
+        """
+        Hybrid search fusing the BM25 and embedding rankings with reciprocal rank fusion
+
+        Returns:
+            List of dicts with doc_id, text, score and the chunk's cosine similarity to the query
+        """
+        # Encoded before taking the lock so lookups do not queue behind each other's inference
+        query_vector = self.embedder.encode([query])[0]
+        with self._lock:
+            matrix, row_chunks = self._load_matrix()
+            if not len(matrix):
+                return []
+            rows, similarities = top_k(matrix, query_vector, candidates + int((row_chunks < 0).sum()))
+            live = row_chunks[rows] >= 0
+            embedding_ranking = list(zip(row_chunks[rows][live].tolist(), similarities[live].tolist()))[:candidates]
+            similarity = dict(embedding_ranking)
+            fused = {}
+            for ranking in (embedding_ranking, self.keyword_search(query, candidates)):
+                for rank, (chunk_id, _) in enumerate(ranking):
+                    fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+            results = []
+            for chunk_id, score in sorted(fused.items(), key=lambda item: -item[1])[:k]:
+                doc_id, row, text = self._conn.execute("SELECT doc_id, row, text FROM chunks WHERE chunk_id = ?",
+                                                       (chunk_id,)).fetchone()
+                if chunk_id not in similarity:
+                    similarity[chunk_id] = float(matrix[row] @ query_vector)
+                results.append({"doc_id": doc_id, "text": text, "score": score, "similarity": similarity[chunk_id]})
+            return results
+
+    def reference_passages(self, question, k=3, threshold=REFERENCE_MATCH_THRESHOLD):
+        """Text of the best matching chunks for a question, None if none is similar enough"""
+        passages = [result["text"] for result in self.search(question, k) if result["similarity"] >= threshold]
+        return "\n".join(passages) if passages else None
+
+    def close(self):
+        self._conn.close()
+
+_reference_index = None
+_reference_index_lock = threading.Lock()
+
+def get_reference_index():
+    """Reference index in REFERENCE_INDEX_DIR, None when nothing has been ingested"""
+    global _reference_index
+    with _reference_index_lock:
+        if _reference_index is None and os.path.exists(os.path.join(REFERENCE_INDEX_DIR, 'index.sqlite3')):
+            _reference_index = ReferenceIndex(REFERENCE_INDEX_DIR)
+        return _reference_index
+
+def iter_document_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(DOCUMENT_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ingest company reference documents for QA retrieval")
+    parser.add_argument('--index-dir', default=REFERENCE_INDEX_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    add_parser = subparsers.add_parser('add', help="Index files or directories, re-indexing changed ones")
+    add_parser.add_argument('paths', nargs='+')
+    remove_parser = subparsers.add_parser('remove', help="Remove documents by path")
+    remove_parser.add_argument('paths', nargs='+')
+    subparsers.add_parser('list', help="List indexed documents")
+    search_parser = subparsers.add_parser('search', help="Show the best matching chunks")
+    search_parser.add_argument('query')
+    search_parser.add_argument('-k', type=int, default=5)
+    args = parser.parse_args()
+
+    index = ReferenceIndex(args.index_dir)
+    if args.command == 'add':
+        def read_documents():
+            for path in iter_document_files(args.paths):
+                with open(path, encoding='utf-8') as f:
+                    yield os.path.relpath(path), f.read()
+        print(f"Indexed {index.add_documents(read_documents())} documents")
+    elif args.command == 'remove':
+        doc_ids = [os.path.relpath(path) for path in iter_document_files(args.paths)]
+        print(f"Removed {index.remove_documents(doc_ids)} chunks")
+    elif args.command == 'list':
+        for doc_id, chunks in index.documents():
+            print(f"{chunks:6d}  {doc_id}")
+    else:
+        for result in index.search(args.query, args.k):
+            print(f"{result['similarity']:.3f}  {result['doc_id']}: {result['text'][:100]}")
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+REPORT_CACHE_PATH = os.getenv('REPORT_CACHE_PATH', os.path.join(os.getcwd(), 'report_cache.sqlite3'))
+# Reports older than this are recomputed
+REPORT_CACHE_TTL = float(os.getenv('REPORT_CACHE_TTL', str(7 * 24 * 3600)))
+# Expired reports younger than TTL + this are served while a fresh one is generated, 0 disables
+REPORT_CACHE_STALE_SECONDS = float(os.getenv('REPORT_CACHE_STALE_SECONDS', '0'))
+REPORT_CACHE_MAX_BYTES = int(os.getenv('REPORT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+def report_key(features, environment, prompt_version):
+    """
+    Cache key of a report request
+
+    The feature payload is canonicalized first, so key order and whitespace
+    differences do not cause misses.
+    """
+    if isinstance(features, str):
+        try:
+            features = json.loads(features)
+        except ValueError:
+            pass
+    canonical = json.dumps([features, environment, prompt_version], sort_keys=True, separators=(',', ':'),
+                           ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class ReportCache:
+    """
+    SQLite backed cache of generated reports with TTL and size bounded LRU eviction.
+
+    With stale_while_revalidate, an expired report still inside the stale
+    window is returned immediately and regenerated in a background thread.
+    """
+
+    def __init__(self, path=REPORT_CACHE_PATH, ttl=REPORT_CACHE_TTL, stale_seconds=REPORT_CACHE_STALE_SECONDS,
+                 max_bytes=REPORT_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.stale_seconds = stale_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            "key TEXT PRIMARY KEY, report TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS reports_accessed_at ON reports (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Look up a report
+
+        Returns:
+            (report, age_seconds), or (None, None) when missing or past the stale window
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT report, created_at FROM reports WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None, None
+            age = now - row[1]
+            if age > self.ttl + self.stale_seconds:
+                self._conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+                self._conn.commit()
+                return None, None
+            self._conn.execute("UPDATE reports SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0], age
+
+    def put(self, key, report):
+        """Store a report, empty ones (e.g. a stream that ended without output) are not cached"""
+        if not report or not report.strip():
+            return
+        now = time.time()
+        size = len(report.encode('utf-8'))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO reports (key, report, size, created_at, accessed_at) "
+                               "VALUES (?, ?, ?, ?, ?)", (key, report, size, now, now))
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM reports WHERE created_at < ?", (now - self.ttl - self.stale_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM reports ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM reports WHERE key = ?", evicted)
+
+    def _refresh(self, key, compute):
+        try:
+            self.put(key, compute())
+        except Exception as e:
+            print(f"Error refreshing cached report: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def lookup(self, key, compute, stale_while_revalidate=None):
+        """
+        Return the cached report for key, or None on a miss
+
+        Args:
+            key: Key from report_key
+            compute: Callable producing the report text, used to refresh a stale report
+            stale_while_revalidate: Serve stale reports while refreshing them in the
+                background, defaults to whether a stale window is configured
+        """
+        if stale_while_revalidate is None:
+            stale_while_revalidate = self.stale_seconds > 0
+        report, age = self.get(key)
+        with self._lock:
+            if report is not None and age <= self.ttl:
+                self.hits += 1
+                return report
+            if report is None or not stale_while_revalidate:
+                self.misses += 1
+                return None
+            self.stale_hits += 1
+            refresh = key not in self._refreshing
+            self._refreshing.add(key)
+        if refresh:
+            threading.Thread(target=self._refresh, args=(key, compute), daemon=True).start()
+        return report
+
+    def get_or_compute(self, key, compute, stale_while_revalidate=None):
+        """
+        Return the cached report for key, generating and storing it with compute() on a miss
+
+        Arguments are those of lookup.
+        """
+        report = self.lookup(key, compute, stale_while_revalidate)
+        if report is None:
+            report = compute()
+            self.put(key, report)
+        return report
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports").fetchone()
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes
+        }
+
+    def close(self):
+        self._conn.close()
+
+_report_cache = None
+_report_cache_lock = threading.Lock()
+
+def get_report_cache():
+    global _report_cache
+    with _report_cache_lock:
+        if _report_cache is None:
+            _report_cache = ReportCache()
+        return _report_cache
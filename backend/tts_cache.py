@@ -0,0 +1,119 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', os.path.join(os.getcwd(), 'tts_cache'))
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+def normalize_text(text):
+    """Collapse whitespace so formatting differences map to the same cache entry"""
+    return re.sub(r'\s+', ' ', text).strip()
+
+class TTSCache:
+    """
+    Size-bounded on-disk cache of synthesized chunk audio with LRU eviction.
+
+    Entries are raw float32 PCM files named by a hash of (voice, speed,
+    normalized text). Recency is kept in memory and mirrored to file mtimes,
+    so the LRU order survives restarts.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.f32'):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+            elif name.endswith('.tmp'):
+                os.remove(path)
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def key(self, voice, speed, text):
+        return hashlib.sha256(f"{voice}\0{speed}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.f32')
+
+    def get(self, voice, speed, text):
+        """Cached audio as a float32 array, or None on a miss"""
+        key = self.key(voice, speed, text)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            audio = np.fromfile(self._path(key), dtype=np.float32)
+            os.utime(self._path(key))
+            return audio
+        except OSError:
+            # Evicted by another thread between the lookup and the read
+            return None
+
+    def put(self, voice, speed, text, audio):
+        key = self.key(voice, speed, text)
+        data = np.ascontiguousarray(audio, dtype=np.float32)
+        if data.nbytes > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data.tofile(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total_bytes += data.nbytes - self._entries.pop(key, 0)
+            self._entries[key] = data.nbytes
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+
+def get_tts_cache():
+    """Shared cache instance, or None when disabled with TTS_CACHE_MAX_BYTES=0"""
+    global _tts_cache
+    if TTS_CACHE_MAX_BYTES <= 0:
+        return None
+    with _tts_cache_lock:
+        if _tts_cache is None:
+            _tts_cache = TTSCache()
+        return _tts_cache
@@ -0,0 +1,135 @@
+import io
+from collections import namedtuple
+import soundfile as sf
+
+AudioFormat = namedtuple('AudioFormat', ['container', 'subtype', 'mimetype', 'extension', 'compression_level', 'bitrate_mode'],
+                         defaults=[None, None])
+
+# Output formats selectable by name, libsndfile encodes all of them natively.
+# MP3 is constant bitrate, a streamed file has no VBR tag for decoders to size it with.
+FORMATS = {
+    'wav': AudioFormat('WAV', 'PCM_16', 'audio/wav', 'wav'),
+    'flac': AudioFormat('FLAC', 'PCM_16', 'audio/flac', 'flac'),
+    'opus': AudioFormat('OGG', 'OPUS', 'audio/ogg', 'ogg'),
+    'mp3': AudioFormat('MP3', 'MPEG_LAYER_III', 'audio/mpeg', 'mp3', 0.8, 'CONSTANT'),
+}
+FORMAT_ALIASES = {'ogg': 'opus', 'mpeg': 'mp3'}
+DEFAULT_FORMAT = 'wav'
+
+def get_format(name):
+    """Look up an output format by name, raising ValueError for unknown names"""
+    name = (name or DEFAULT_FORMAT).lower()
+    name = FORMAT_ALIASES.get(name, name)
+    if name not in FORMATS:
+        raise ValueError(f"Unsupported audio format '{name}', expected one of {sorted(FORMATS)}")
+    return name
+
+def negotiate_format(requested=None, accept_mimetypes=None):
+    """
+    Pick the output format from an explicit name, falling back to the Accept header
+
+    Args:
+        requested: Format name from the request, takes precedence when given
+        accept_mimetypes: werkzeug MIMEAccept of the request
+
+    Returns:
+        The format name, WAV if nothing better is acceptable
+    """
+    if requested:
+        return get_format(requested)
+    if accept_mimetypes:
+        # WAV is listed first so wildcard Accept headers keep the old behaviour
+        mimetypes = [FORMATS[DEFAULT_FORMAT].mimetype] + [fmt.mimetype for name, fmt in FORMATS.items() if name != DEFAULT_FORMAT]
+        best = accept_mimetypes.best_match(mimetypes)
+        for name, fmt in FORMATS.items():
+            if fmt.mimetype == best:
+                return name
+    return DEFAULT_FORMAT
+
+class _StreamSink:
+    """
+    Write-only file object that hands encoded bytes out as soon as they are written.
+
+    FLAC and MP3 encoders seek back on close to patch totals into their headers.
+    Those bytes have already been sent by then, so writes before the drained
+    offset are dropped; the streams stay valid without the totals.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._drained = 0
+        self._position = 0
+        self._size = 0
+
+    def write(self, data):
+        data = bytes(data)
+        start = self._position
+        self._position += len(data)
+        self._size = max(self._size, self._position)
+        skip = max(0, self._drained - start)
+        if skip < len(data):
+            offset = start + skip - self._drained
+            self._buffer[offset:offset + len(data) - skip] = data[skip:]
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = offset
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def read(self, size=-1):
+        return b''
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._drained += len(data)
+        self._buffer.clear()
+        return data
+
+def _encoder_options(audio_format, compression_level=None):
+    if compression_level is None:
+        compression_level = audio_format.compression_level
+    if compression_level is None:
+        return {}
+    return {'compression_level': compression_level, 'bitrate_mode': audio_format.bitrate_mode}
+
+def iter_encoded(audio_parts, fmt, sample_rate, compression_level=None):
+    """
+    Encode float32 arrays into the given format, yielding bytes as they are produced
+
+    Args:
+        audio_parts: Iterable of mono float32 arrays, consumed lazily
+        fmt: Format name from FORMATS
+        sample_rate: Sample rate of the arrays
+        compression_level: Optional libsndfile compression level between 0 and 1
+
+    Yields:
+        Encoded bytes, the concatenation is a complete file
+    """
+    audio_format = FORMATS[get_format(fmt)]
+    sink = _StreamSink()
+    with sf.SoundFile(sink, 'w', sample_rate, 1, subtype=audio_format.subtype, format=audio_format.container,
+                      **_encoder_options(audio_format, compression_level)) as output:
+        for audio in audio_parts:
+            output.write(audio)
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+def encode_audio(audio, fmt, sample_rate, compression_level=None):
+    """Encode a whole array into an in-memory file with complete headers"""
+    audio_format = FORMATS[get_format(fmt)]
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sample_rate, subtype=audio_format.subtype, format=audio_format.container,
+             **_encoder_options(audio_format, compression_level))
+    buffer.seek(0)
+    return buffer